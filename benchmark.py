@@ -0,0 +1,296 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""In-process benchmarks of the triangulation engines, the is_delaunay test
+and the output writers.
+
+Every case is timed inside this process (no interpreter start-up or file
+system noise: the writers write to memory), after warmup runs, over a
+number of repeats; garbage collection is off while a run is timed. The
+results are written as JSON and can be compared with an earlier (baseline)
+result file:
+
+    $ python benchmark.py --output results.json
+    $ python benchmark.py --compare results.json --threshold 0.1
+
+The compare run exits with status 1 when a case got slower than the
+baseline by more than the threshold (on the median time).
+
+With --nearest-queries the nearest-neighbour queries of
+DelaunayTriangulation.nearest are timed as well, against a scan over all
+points with Point.distance (timed for a sample of the queries and scaled
+to all of them: a full scan of 10^6 queries takes about a day). For
+10^6 uniform queries on 100000 points (CPython 3.11, vectorized point
+location, scan of 100 queries):
+
+    $ python benchmark.py --sizes 50 --nearest-queries 1000000 --nearest-points 100000
+
+    k      nearest     naive scan (scaled)
+    1        7.5 s        ~ 94000 s
+    10        26 s        ~ 78000 s
+"""
+
+import gc
+import heapq
+import io
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+
+import predicates
+import workloads
+from delaunay import DelaunayTriangulation
+from geometry import Point, PointArray, Triangle
+
+# largest n every engine is run for (brute force is O(n^4))
+METHOD_LIMITS = {
+    "brute_force": 100,
+    "vectorized": 400,
+    "bowyer_watson": 20000,
+    "divide_and_conquer": 20000,
+}
+# run by default; every distribution of workloads.py can be selected too
+DISTRIBUTIONS = ("uniform", "integer", "clustered")
+ALL_DISTRIBUTIONS = ("integer",) + workloads.DISTRIBUTIONS
+SIZES = (50, 100, 200, 400, 1000, 5000, 20000)
+
+
+def make_points(distribution, n, seed=2023):
+    """Returns a PointArray with *n* points of *distribution*:
+
+    "integer" -- random integer coordinates in [0, 1000] (as
+        make_random_points, with duplicates removed, so a few less)
+    any of workloads.DISTRIBUTIONS -- exactly *n* unique points in
+        [0, 1000) x [0, 1000) (see workloads.make_points)
+    """
+    if distribution != "integer":
+        return workloads.make_points(distribution, n, seed)
+    rng = random.Random(seed)
+    coords = {(float(rng.randint(0, 1000)), float(rng.randint(0, 1000))) for _ in range(n)}
+    coords = sorted(coords)
+    rng.shuffle(coords)
+    xs = [x for x, y in coords]
+    ys = [y for x, y in coords]
+    return PointArray(xs, ys)
+
+
+def measure(run, setup=None, repeat=5, warmup=1):
+    """Times run(*setup()) *repeat* times after *warmup* untimed runs;
+    setup (not timed) gives fresh input for every run.
+
+    Returns list of float (seconds)
+    """
+    times = []
+    for r in range(warmup + repeat):
+        args = setup() if setup is not None else ()
+        enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run(*args)
+            elapsed = time.perf_counter() - start
+        finally:
+            if enabled:
+                gc.enable()
+        if r >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def _summary(times):
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def _counters():
+    """Counters of one (the last) run: Triangle memoization and predicate
+    calls
+    """
+    return {"triangle": dict(Triangle.stats), "predicates": dict(predicates.stats)}
+
+
+def _reset_counters():
+    Triangle.reset_stats()
+    predicates.reset_stats()
+
+
+def _fresh_copy(dt):
+    """Copy of triangulation *dt* with new Triangle instances (nothing
+    memoized yet), so every writer run does all of its work
+    """
+    copy = DelaunayTriangulation(dt.points)
+    copy.triangles = [Triangle(t.p0, t.p1, t.p2) for t in dt.triangles]
+    copy.triangle_indices = dt.triangle_indices
+    return copy
+
+
+def run_cases(sizes=SIZES, distributions=DISTRIBUTIONS, methods=tuple(METHOD_LIMITS),
+              repeat=5, warmup=1, is_delaunay_triples=2000, log=print):
+    """Runs all benchmark cases; returns list of result dicts"""
+    results = []
+
+    def record(name, distribution, n, times):
+        entry = {"name": name, "distribution": distribution, "n": n}
+        entry.update(_summary(times))
+        entry["counters"] = _counters()
+        results.append(entry)
+        log(f"{name:32s} {distribution:10s} n={n:<6d} median {entry['median'] * 1000:10.2f} ms")
+
+    for distribution in distributions:
+        for n in sizes:
+            points = make_points(distribution, n)
+            for method in methods:
+                if n > METHOD_LIMITS.get(method, math.inf):
+                    continue
+                _reset_counters()
+                times = measure(lambda dt: dt.triangulate(method),
+                                lambda: (DelaunayTriangulation(points),), repeat, warmup)
+                record(f"triangulate/{method}", distribution, n, times)
+            # the brute-force inner test, on a fixed sample of triples
+            dt = DelaunayTriangulation(points)
+            rng = random.Random(n)
+            triples = [sorted(rng.sample(range(len(points)), 3)) for _ in range(is_delaunay_triples)]
+
+            def test_all(triangles):
+                for tri in triangles:
+                    dt.is_delaunay(tri)
+
+            _reset_counters()
+            times = measure(test_all, lambda: ([Triangle(points[i], points[j], points[k])
+                                                for i, j, k in triples],), repeat, warmup)
+            record("is_delaunay", distribution, n, times)
+            # the writers, on the Bowyer-Watson triangulation
+            dt.triangulate("bowyer_watson")
+            for name in ("output_points", "output_triangles", "output_circumcircles"):
+                if name == "output_circumcircles" and n > 5000:
+                    # 401 vertices per circle: keep the run time sensible
+                    continue
+                _reset_counters()
+                times = measure(lambda copy: getattr(copy, name)(io.BytesIO()),
+                                lambda: (_fresh_copy(dt),), repeat, warmup)
+                record(name, distribution, n, times)
+    return results
+
+
+def run_nearest(n_points=20000, n_queries=1000000, ks=(1, 10), naive_queries=100,
+                distribution="uniform", log=print):
+    """Times DelaunayTriangulation.nearest for *n_queries* query points
+    (of the same distribution) on *n_points* points, and the naive scan
+    with Point.distance for the first *naive_queries* of them, scaled to
+    all queries; returns list of result dicts
+    """
+    results = []
+    points = make_points(distribution, n_points)
+    queries = make_points(distribution, n_queries, seed=2024)
+    dt = DelaunayTriangulation(points)
+    dt.triangulate("divide_and_conquer")
+    sample = [Point(queries[i].x, queries[i].y) for i in range(min(naive_queries, len(queries)))]
+
+    def scan(k):
+        for q in sample:
+            heapq.nsmallest(k, range(len(points)), key=lambda i: q.distance(points[i]))
+
+    for k in ks:
+        cases = (
+            (f"nearest/delaunay k={k}", lambda: dt.nearest(queries, k, vectorized=True), 1.0),
+            (f"nearest/naive scan k={k}", lambda: scan(k), len(queries) / len(sample)),
+        )
+        for name, run, scale in cases:
+            times = [seconds * scale for seconds in measure(run, repeat=1, warmup=0)]
+            entry = {"name": name, "distribution": distribution, "n": n_points,
+                     "queries": len(queries)}
+            entry.update(_summary(times))
+            results.append(entry)
+            log(f"{name:32s} {distribution:10s} n={n_points:<6d} median {entry['median']:10.2f} s "
+                f"({len(queries)} queries)")
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """Compares the median times of *results* with those of *baseline*
+    (same case: name, distribution and n).
+
+    Returns list of (case, baseline median, new median, ratio) tuples for
+    the cases that are more than *threshold* (fraction) slower
+    """
+    base = {(r["name"], r["distribution"], r["n"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        key = (r["name"], r["distribution"], r["n"])
+        old = base.get(key)
+        if old is None or old["median"] <= 0:
+            continue
+        ratio = r["median"] / old["median"]
+        if ratio > 1.0 + threshold:
+            regressions.append((key, old["median"], r["median"], ratio))
+    return regressions
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments (without the script name)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="In-process benchmarks of the triangulation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="numbers of points (default: %(default)s)")
+    parser.add_argument("--distributions", nargs="+", default=list(DISTRIBUTIONS),
+                        choices=ALL_DISTRIBUTIONS,
+                        help="point distributions (default: %(default)s)")
+    parser.add_argument("--methods", nargs="+", default=list(METHOD_LIMITS),
+                        choices=list(METHOD_LIMITS), help="engines (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs first (default: 1)")
+    parser.add_argument("--output", default="benchmark.json", help="JSON result file")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slow-down (fraction of the baseline) that counts as a "
+                             "regression (default: 0.1)")
+    parser.add_argument("--nearest-queries", type=int, default=0,
+                        help="also time nearest-neighbour queries, this many (default: 0, off)")
+    parser.add_argument("--nearest-points", type=int, default=20000,
+                        help="points to query for --nearest-queries (default: 20000)")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_arguments(argv)
+    results = run_cases(args.sizes, args.distributions, args.methods, args.repeat, args.warmup)
+    if args.nearest_queries:
+        results += run_nearest(args.nearest_points, args.nearest_queries)
+    report = {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "warmup": args.warmup,
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=1)
+    print("results written to", args.output)
+    if args.compare is not None:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for (name, distribution, n), old, new, ratio in regressions:
+            print(f"REGRESSION {name} {distribution} n={n}: "
+                  f"{old * 1000:.2f} ms -> {new * 1000:.2f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print("no regressions beyond", args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,182 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""On-disk cache of triangulation results.
+
+A result is stored under a key that is the SHA-256 hash of everything it
+depends on: the coordinates (as float64 bytes, in order), the engine and
+the test rules (the 1e-8 epsilon or the exact predicates). One file per
+result, named after the key, holds the triangle index triples as packed
+unsigned integers (4 bytes per index below 2**32 points):
+
+    magic b"DTC1", typecode (1 byte), 3 bytes padding,
+    number of points (uint64), number of triangles (uint64), indices
+
+Several processes can share a cache directory: a file is written under a
+temporary name and then renamed (os.replace, atomic), so a reader sees a
+complete file or none. When the directory grows beyond *max_bytes*, the
+least recently used files are removed (every hit touches its file, so the
+modification time is the time of last use). The files get the mode of
+any new file of the process (0666 minus the umask), so that processes of
+other accounts can read them as well.
+"""
+
+import hashlib
+import os
+import secrets
+import struct
+import sys
+from array import array
+
+from geometry import coordinates
+
+_MAGIC = b"DTC1"
+_HEADER = struct.Struct("<4sc3xQQ")
+_SUFFIX = ".tri"
+# (no newline translation of the data on Windows)
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+class ResultCache:
+    """Triangle index triples on disk, by key (see the module docstring)"""
+
+    def __init__(self, directory, max_bytes=256 << 20):
+        """Constructor
+
+        :param directory: the cache directory (created when missing)
+        :type directory: str
+
+        :param max_bytes: size the cache is kept under
+        :type max_bytes: int
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        # what happened in this process
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def key(points, method, robust=False):
+        """Returns the key (hex str) of the triangulation of *points* (a
+        PointArray or sequence of Point) with engine *method* and the exact
+        predicates (*robust*) or the 1e-8 epsilon rules
+        """
+        xs, ys = coordinates(points)
+        digest = hashlib.sha256()
+        digest.update(f"{method}\0{'exact' if robust else 'epsilon=1e-8'}\0{len(xs)}\0".encode())
+        for values in (xs, ys):
+            values = values if isinstance(values, (array, memoryview)) else array("d", values)
+            if sys.byteorder != "little":
+                values = array("d", values)
+                values.byteswap()
+            digest.update(values)
+        return digest.hexdigest()
+
+    def path(self, key):
+        """Path of the file of *key*"""
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """Returns the list of (i, j, k) triples stored under *key*, None
+        when there is none (or the file is damaged: it is removed)
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            self.stats["misses"] += 1
+            return None
+        try:
+            magic, typecode, n_points, n_triangles = _HEADER.unpack_from(data)
+            indices = array(typecode.decode())
+            if magic != _MAGIC or len(data) != _HEADER.size + 3 * n_triangles * indices.itemsize:
+                raise ValueError("damaged cache file")
+            indices.frombytes(data[_HEADER.size:])
+        except (ValueError, struct.error):
+            self._remove(path)
+            self.stats["misses"] += 1
+            return None
+        if sys.byteorder != "little":
+            indices.byteswap()
+        try:
+            # last use, for the eviction
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats["hits"] += 1
+        it = iter(indices)
+        return list(zip(it, it, it))
+
+    def put(self, key, triples, n_points):
+        """Stores the (i, j, k) *triples* (of a triangulation of *n_points*
+        points) under *key*, then evicts the least recently used files
+        when the cache is too large
+        """
+        typecode = "I" if n_points < 1 << 32 else "Q"
+        indices = array(typecode)
+        for triple in triples:
+            indices.extend(triple)
+        if sys.byteorder != "little":
+            indices.byteswap()
+        fd, tmp = self._create_temporary()
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(_HEADER.pack(_MAGIC, typecode.encode(), n_points, len(indices) // 3))
+                indices.tofile(fh)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            self._remove(tmp)
+            raise
+        self.stats["stores"] += 1
+        self.evict()
+
+    def _create_temporary(self):
+        """Creates a new, uniquely named temporary file in the cache
+        directory, with mode 0666 minus the umask (applied by the kernel;
+        tempfile.mkstemp would make it readable by the owner only, while
+        other accounts may share the cache)
+
+        Returns (file descriptor, path)
+        """
+        while True:
+            path = os.path.join(self.directory, f"{os.getpid()}-{secrets.token_hex(8)}.tmp")
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | _O_BINARY, 0o666)
+                return fd, path
+            except FileExistsError:
+                continue
+
+    def evict(self):
+        """Removes the least recently used files until the cache is
+        smaller than max_bytes
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(_SUFFIX):
+                    continue
+                try:
+                    info = entry.stat()
+                except OSError:
+                    # removed by another process
+                    continue
+                entries.append((info.st_mtime, info.st_size, entry.path))
+                total += info.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                self.stats["evictions"] += 1
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
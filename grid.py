@@ -0,0 +1,102 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+import math
+from geometry import coordinates
+
+
+class PointGrid:
+    """Uniform grid (bucket) index over a set of points.
+
+    The bounding box of the points is divided into square cells, every
+    cell holds the indices of the points that fall inside it. Queries only
+    visit the cells that overlap the area asked for.
+    """
+
+    def __init__(self, points, points_per_cell=2.0):
+        """Constructor
+
+        :param points: the points to index
+        :type points: sequence of Point or PointArray
+
+        :param points_per_cell: average number of points per cell aimed for
+        :type points_per_cell: float
+        """
+        self.points = points
+        n = len(points)
+        xs, ys = coordinates(points)
+        self.xmin, self.ymin = min(xs), min(ys)
+        width = max(xs) - self.xmin
+        height = max(ys) - self.ymin
+        cells_wanted = max(1.0, n / points_per_cell)
+        # not smaller than the longest side / cells_wanted: for a long thin
+        # strip (or points on a line) the area-based size would give far
+        # more cells than points; so at most cells_wanted + 1 per axis and
+        # about 3 * cells_wanted in total
+        cell_size = max(math.sqrt(width * height / cells_wanted),
+                        max(width, height) / cells_wanted) or 1.0
+        self.cell_size = cell_size
+        limit = int(cells_wanted) + 1
+        self.ncols = min(int(width / cell_size) + 1, limit)
+        self.nrows = min(int(height / cell_size) + 1, limit)
+        self.cells = [[] for _ in range(self.ncols * self.nrows)]
+        # number of points tested by count_covered so far
+        self.tests = 0
+        for i in range(n):
+            col, row = self.cell_of(xs[i], ys[i])
+            self.cells[row * self.ncols + col].append(i)
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell_of(self, x, y):
+        """Returns (column, row) of the cell that contains (x, y), clamped
+        to the grid.
+        """
+        col = int((x - self.xmin) / self.cell_size)
+        row = int((y - self.ymin) / self.cell_size)
+        col = min(max(col, 0), self.ncols - 1)
+        row = min(max(row, 0), self.nrows - 1)
+        return col, row
+
+    def query_box(self, xmin, ymin, xmax, ymax):
+        """Generates the indices of the points in all cells that overlap the
+        box [xmin, xmax] x [ymin, ymax] (a superset of the points inside it).
+        """
+        if xmax < xmin or ymax < ymin:
+            return
+        col0, row0 = self.cell_of(xmin, ymin)
+        col1, row1 = self.cell_of(xmax, ymax)
+        cells, ncols = self.cells, self.ncols
+        for row in range(row0, row1 + 1):
+            for cell in cells[row * ncols + col0:row * ncols + col1 + 1]:
+                yield from cell
+
+    def query_circle(self, cx, cy, radius):
+        """Generates the indices of the points in all cells that overlap the
+        bounding box of the circle with center (cx, cy) and *radius*.
+        """
+        return self.query_box(cx - radius, cy - radius, cx + radius, cy + radius)
+
+    def count_covered(self, circle, stop_at=None):
+        """Counts the points covered by *circle* (see Circle.covers).
+
+        Only the cells overlapping the bounding box of the circle are
+        visited. When *stop_at* is given, counting stops as soon as that
+        many covered points have been found.
+        """
+        # Circle.covers accepts points up to 1e-8 outside the circle; the
+        # small extra margin absorbs rounding in the distance and in the
+        # cell computation (which grows with the size of the coordinates)
+        cx, cy = circle.center.x, circle.center.y
+        reach = (circle.radius + 1e-8) * (1.0 + 1e-12) + 1e-12 * (abs(cx) + abs(cy))
+        points = self.points
+        count = tested = 0
+        for tested, i in enumerate(self.query_circle(cx, cy, reach), 1):
+            if circle.covers(points[i]):
+                count += 1
+                if count == stop_at:
+                    break
+        self.tests += tested
+        return count
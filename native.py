@@ -0,0 +1,129 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Python binding (ctypes) of the C++ brute-force triangulation of
+triangulate.cpp.
+
+The shared library is built by the CMakeLists.txt next to this file:
+
+    $ cmake -S . -B build -DCMAKE_BUILD_TYPE=Release
+    $ cmake --build build
+
+It is looked for in the file named by the TRIANGULATE_LIB environment
+variable, and else in build/, cmake-build-release/, cmake-build-debug/ and
+the directory of this module. When it is not found, available() returns
+False (DelaunayTriangulation then uses the Python engine).
+"""
+
+import ctypes
+import os
+import sys
+from array import array
+
+_NAMES = {"win32": "triangulate.dll", "darwin": "libtriangulate.dylib"}
+_DIRECTORIES = ("build", "cmake-build-release", "cmake-build-debug", "")
+
+_library = None
+_searched = False
+
+
+def _find_library():
+    """Returns the path of the shared library, None if it is not built"""
+    path = os.environ.get("TRIANGULATE_LIB")
+    if path:
+        return path if os.path.isfile(path) else None
+    name = _NAMES.get(sys.platform, "libtriangulate.so")
+    here = os.path.dirname(os.path.abspath(__file__))
+    for directory in _DIRECTORIES:
+        path = os.path.join(here, directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _load():
+    """Returns the loaded library (ctypes.CDLL), None if not available"""
+    global _library, _searched
+    if not _searched:
+        _searched = True
+        path = _find_library()
+        if path is not None:
+            try:
+                lib = ctypes.CDLL(path)
+            except OSError:
+                return None
+            double_p = ctypes.POINTER(ctypes.c_double)
+            lib.triangulate_xy.argtypes = [double_p, double_p, ctypes.c_int64, ctypes.c_int]
+            lib.triangulate_xy.restype = ctypes.c_void_p
+            lib.result_size.argtypes = [ctypes.c_void_p]
+            lib.result_size.restype = ctypes.c_int64
+            lib.result_copy.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int64)]
+            lib.result_copy.restype = None
+            lib.result_free.argtypes = [ctypes.c_void_p]
+            lib.result_free.restype = None
+            _library = lib
+    return _library
+
+
+def available():
+    """Returns whether the shared library could be loaded"""
+    return _load() is not None
+
+
+def _as_doubles(values, n):
+    """Returns a ctypes array of *n* doubles for the float64 buffer
+    *values*, sharing its memory (no copy) when it is writable; read-only
+    buffers (e.g. bytes) and other sequences are copied.
+    """
+    try:
+        view = memoryview(values)
+    except TypeError:
+        return (ctypes.c_double * n)(*values)
+    if view.format not in ("d", "<d", "=d") or not view.c_contiguous:
+        raise ValueError("coordinates should be a contiguous buffer of float64 values")
+    if view.readonly:
+        return (ctypes.c_double * n).from_buffer_copy(view)
+    return (ctypes.c_double * n).from_buffer(view)
+
+
+def triangulate(xs, ys, threads=1):
+    """Brute-force Delaunay triangulation in C++ of the points with
+    coordinates *xs*, *ys*.
+
+    The coordinates are passed to the library without copying when they
+    are writable, contiguous float64 buffers (array('d'), the buffers of a
+    PointArray, a NumPy float64 array); other sequences of numbers are
+    copied first. The rules are those of the Python brute-force engine
+    (1e-8 epsilon; no triangles for 4 or more cocircular points).
+
+    :param xs: x-coordinates
+    :type xs: buffer of float64, or sequence of float
+
+    :param ys: y-coordinates
+    :type ys: buffer of float64, or sequence of float
+
+    :param threads: number of threads the work is split over (the result
+        is the same for any number)
+    :type threads: int
+
+    Returns array('q') with 3 point indices per triangle (i < j < k,
+    ordered as the Python engine orders them)
+    """
+    lib = _load()
+    if lib is None:
+        raise RuntimeError("the triangulate library is not built (see native.py)")
+    n = len(xs)
+    if len(ys) != n:
+        raise ValueError("xs and ys should have the same length")
+    cxs = _as_doubles(xs, n)
+    cys = _as_doubles(ys, n)
+    handle = lib.triangulate_xy(cxs, cys, n, threads)
+    try:
+        result = array("q", bytes(8 * lib.result_size(handle)))
+        if result:
+            address, _ = result.buffer_info()
+            lib.result_copy(handle, ctypes.cast(address, ctypes.POINTER(ctypes.c_int64)))
+    finally:
+        lib.result_free(handle)
+    return result
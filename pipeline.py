@@ -0,0 +1,158 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Triangulating and writing the output files at the same time.
+
+The engine produces its triangles through a generator
+(DelaunayTriangulation.iter_triangles); they are collected in batches
+and handed over through a bounded queue to a background thread that
+writes the triangles and circumcircles files. A second thread writes the
+points file. When the writer falls behind, the queue fills up and the
+engine waits (backpressure), so at most *max_batches* batches of
+Triangle instances exist at any time (no self.triangles list is made).
+
+Only the brute-force engine (also with workers) and the vectorized engine
+find their triangles one by one, so that their peak memory does not grow
+with the number of triangles (the vectorized engine does hold its
+n(n-1)/2 pairs of point indices). Bowyer-Watson, divide and conquer and
+the native engine first build the whole mesh and the sorted list of index
+triples (see iter_triangles) and only then hand them over; what they save
+is the Triangle instances and the output text, not the mesh, so that
+their peak memory still grows with the number of points (for a bounded
+mesh, see streaming.triangulate_file, which triangulates tile by tile).
+Peak memory of the pipeline itself (Bowyer-Watson, output discarded;
+tracemalloc):
+
+    5000 points     4.6 MB
+    20000 points    8.5 MB
+    40000 points   14.9 MB
+
+The threads share the interpreter lock, so Python code does not run in
+parallel; what overlaps are only the parts that release it (file writes,
+part of the gzip compression, NumPy and native engine work). The gain is
+in memory, not in time, as measured for 20000 points (Bowyer-Watson,
+400-segment circles, CPython 3.11; memory with tracemalloc):
+
+                                       peak memory    time    time (gzip)
+    main (triangulate, then write)       58 MB        33 s       62 s
+    triangulate_and_write                12 MB        32 s       66 s
+
+For the brute-force engines the files are complete as soon as the last
+triangle is found.
+"""
+
+import queue
+import threading
+
+from geometry import Triangle
+from wkt_writer import WKTWriter, point_rows, triangle_rows, circumcircle_rows
+
+
+class _WriterThread(threading.Thread):
+    """Thread that runs *target*, keeping the exception it raises (if any)
+    so that the caller can raise it again
+    """
+
+    def __init__(self, target, name):
+        super().__init__(name=name, daemon=True)
+        self._target_function = target
+        self.error = None
+
+    def run(self):
+        try:
+            self._target_function()
+        except BaseException as error:
+            self.error = error
+
+
+def _put(batches, item, writer):
+    """Puts *item* in the bounded queue, waiting while it is full; stops
+    waiting when the writer thread has died (its error is raised later)
+    """
+    while True:
+        try:
+            batches.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            if not writer.is_alive():
+                return False
+
+
+def triangulate_and_write(dt, method, points_file, triangles_file, circumcircles_file,
+                          compress=False, segments=400, max_error=None, workers=1,
+                          batch_size=1024, max_batches=8, max_segments=None):
+    """Triangulates the points of *dt* (a DelaunayTriangulation) with
+    *method* and writes the points, triangles and circumcircles files
+    while the engine runs (see the module docstring). The files are those
+    of output_points, output_triangles and output_circumcircles, with the
+    triangles numbered from 0 as triangle_id; dt.triangles is not filled.
+
+    :param batch_size: number of triangles handed over at a time
+    :type batch_size: int
+
+    :param max_batches: number of batches the queue holds before the
+        engine has to wait for the writer
+    :type max_batches: int
+
+    For the sinks and *compress* see wkt_writer.WKTWriter, for *segments*,
+    *max_error* and *max_segments* output_circumcircles, for *workers*
+    triangulate.
+
+    Returns the number of triangles written
+    """
+    points = dt.points
+    batches = queue.Queue(max_batches)
+
+    def write_points():
+        with WKTWriter(points_file, compress) as out:
+            out.write_rows(point_rows(points))
+
+    def write_triangles():
+        with WKTWriter(triangles_file, compress) as tri_out, \
+                WKTWriter(circumcircles_file, compress) as circle_out:
+            header = True
+            while True:
+                item = batches.get()
+                if item is None:
+                    break
+                first_id, batch = item
+                tri_out.write_rows(triangle_rows(batch, header, first_id=first_id))
+                circle_out.write_rows(circumcircle_rows(batch, segments, max_error, header, first_id,
+                                                         max_segments))
+                header = False
+            if header:
+                # no triangles at all: still write the headers
+                tri_out.write_rows(triangle_rows((), True))
+                circle_out.write_rows(circumcircle_rows((), segments, max_error, True))
+
+    point_writer = _WriterThread(write_points, "points writer")
+    triangle_writer = _WriterThread(write_triangles, "triangles writer")
+    point_writer.start()
+    triangle_writer.start()
+    count = 0
+    try:
+        batch = []
+        for i, j, k, tri in dt.iter_triangles(method, workers):
+            if tri is None:
+                tri = Triangle(points[i], points[j], points[k])
+            batch.append(tri)
+            if len(batch) == batch_size:
+                # the triangles are numbered in the order they leave the
+                # engine (id(tri) is reused once a batch is freed)
+                if not _put(batches, (count, batch), triangle_writer):
+                    break
+                count += len(batch)
+                batch = []
+        else:
+            if batch:
+                _put(batches, (count, batch), triangle_writer)
+            count += len(batch)
+    finally:
+        _put(batches, None, triangle_writer)
+        triangle_writer.join()
+        point_writer.join()
+    for writer in (triangle_writer, point_writer):
+        if writer.error is not None:
+            raise writer.error
+    return count
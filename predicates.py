@@ -0,0 +1,189 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Robust orientation and in-circle predicates.
+
+Both predicates first evaluate their determinant with ordinary floating
+point arithmetic, together with a bound on the rounding error of that
+evaluation (the static filters of J.R. Shewchuk, "Adaptive Precision
+Floating-Point Arithmetic and Fast Robust Geometric Predicates", 1997).
+Only when the result is smaller than the error bound, so that even its
+sign is uncertain, the determinant is evaluated again with exact rational
+arithmetic. The sign of the result is therefore always correct, also for
+large (e.g. projected) coordinates and (nearly) degenerate input.
+"""
+
+from fractions import Fraction
+
+# machine epsilon as used in the error bounds (half an ulp of 1.0)
+_EPSILON = 2.0 ** -53
+CCW_ERRBOUND = (3.0 + 16.0 * _EPSILON) * _EPSILON
+ICC_ERRBOUND = (10.0 + 96.0 * _EPSILON) * _EPSILON
+
+# number of calls, and how many of them needed the exact evaluation
+stats = {"orient2d": 0, "orient2d_exact": 0, "incircle": 0, "incircle_exact": 0}
+
+
+def reset_stats():
+    """Sets all call counters back to 0"""
+    for key in stats:
+        stats[key] = 0
+
+
+def orient2d(ax, ay, bx, by, cx, cy):
+    """Orientation of the points a, b and c.
+
+    Returns a positive value when a, b, c are in counter-clockwise order,
+    a negative value when clockwise and 0 when the points are collinear.
+    The sign is exact; the value approximates twice the signed area of
+    triangle abc.
+    """
+    stats["orient2d"] += 1
+    detleft = (ax - cx) * (by - cy)
+    detright = (ay - cy) * (bx - cx)
+    det = detleft - detright
+    if detleft > 0.0:
+        if detright <= 0.0:
+            return det
+        detsum = detleft + detright
+    elif detleft < 0.0:
+        if detright >= 0.0:
+            return det
+        detsum = -detleft - detright
+    else:
+        return det
+    errbound = CCW_ERRBOUND * detsum
+    if det >= errbound or -det >= errbound:
+        return det
+    return orient2d_exact(ax, ay, bx, by, cx, cy)
+
+
+def orient2d_exact(ax, ay, bx, by, cx, cy):
+    """orient2d, evaluated with exact rational arithmetic"""
+    stats["orient2d_exact"] += 1
+    ax, ay, bx, by, cx, cy = (Fraction(v) for v in (ax, ay, bx, by, cx, cy))
+    return float((ax - cx) * (by - cy) - (ay - cy) * (bx - cx))
+
+
+def incircle(ax, ay, bx, by, cx, cy, dx, dy):
+    """Position of point d relative to the circle through a, b and c.
+
+    For a, b, c in counter-clockwise order, returns a positive value when
+    d lies inside the circle, a negative value when outside and 0 when d
+    is on the circle (the signs flip for clockwise a, b, c). The sign is
+    exact.
+    """
+    stats["incircle"] += 1
+    adx = ax - dx
+    bdx = bx - dx
+    cdx = cx - dx
+    ady = ay - dy
+    bdy = by - dy
+    cdy = cy - dy
+
+    bdxcdy = bdx * cdy
+    cdxbdy = cdx * bdy
+    alift = adx * adx + ady * ady
+
+    cdxady = cdx * ady
+    adxcdy = adx * cdy
+    blift = bdx * bdx + bdy * bdy
+
+    adxbdy = adx * bdy
+    bdxady = bdx * ady
+    clift = cdx * cdx + cdy * cdy
+
+    det = (alift * (bdxcdy - cdxbdy)
+           + blift * (cdxady - adxcdy)
+           + clift * (adxbdy - bdxady))
+    permanent = ((abs(bdxcdy) + abs(cdxbdy)) * alift
+                 + (abs(cdxady) + abs(adxcdy)) * blift
+                 + (abs(adxbdy) + abs(bdxady)) * clift)
+    errbound = ICC_ERRBOUND * permanent
+    if det > errbound or -det > errbound or errbound == 0.0:
+        # (all terms are 0 when the bound is, e.g. when d is one of a, b, c)
+        return det
+    return incircle_exact(ax, ay, bx, by, cx, cy, dx, dy)
+
+
+def incircle_exact(ax, ay, bx, by, cx, cy, dx, dy):
+    """incircle, evaluated with exact rational arithmetic"""
+    stats["incircle_exact"] += 1
+    ax, ay, bx, by, cx, cy, dx, dy = (Fraction(v) for v in (ax, ay, bx, by, cx, cy, dx, dy))
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+    return float((adx * adx + ady * ady) * (bdx * cdy - cdx * bdy)
+                 + (bdx * bdx + bdy * bdy) * (cdx * ady - adx * cdy)
+                 + (cdx * cdx + cdy * cdy) * (adx * bdy - bdx * ady))
+
+
+def incircle_perturbed(ax, ay, bx, by, cx, cy, dx, dy):
+    """incircle, with ties (cocircular points) broken consistently.
+
+    When the four points are exactly cocircular, the sign is decided as
+    if the points were lifted to the paraboloid z = x**2 + y**2 and then
+    each raised by an infinitesimal amount, the lexicographically smallest
+    point (by x, then y) by far the most ("simulation of simplicity",
+    Edelsbrunner and Muecke 1990). The result is never 0 for
+    non-collinear a, b, c, and, as the tie-break only depends on the
+    coordinates, every triangulation built with it is the same, whatever
+    order the points were inserted in.
+    """
+    det = incircle(ax, ay, bx, by, cx, cy, dx, dy)
+    if det != 0:
+        return det
+    # derivative of the determinant to the raise of every point: the
+    # orientation of the other three (with alternating sign)
+    terms = sorted([
+        ((ax, ay), orient2d(bx, by, cx, cy, dx, dy)),
+        ((bx, by), -orient2d(ax, ay, cx, cy, dx, dy)),
+        ((cx, cy), orient2d(ax, ay, bx, by, dx, dy)),
+        ((dx, dy), -orient2d(ax, ay, bx, by, cx, cy)),
+    ])
+    for _, term in terms:
+        if term != 0:
+            return term
+    return 0.0
+
+
+def _benchmark():
+    """Triangulates random points with large (projected) coordinates, and
+    on an integer grid (many degenerate cases), and reports how many
+    predicate calls were decided by the floating point fast path.
+    """
+    import random
+    import time
+    import predicates
+    from geometry import PointArray
+    from delaunay import DelaunayTriangulation
+
+    rng = random.Random(2023)
+    n = 20000
+    cases = [
+        ("random, x ~ 1e5..1e6", PointArray(
+            [rng.uniform(1e5, 1e6) for _ in range(n)], [rng.uniform(1e5, 1e6) for _ in range(n)])),
+        ("random, offset 1e6, 1 m spread", PointArray(
+            [1e6 + rng.random() for _ in range(n)], [1e6 + rng.random() for _ in range(n)])),
+        ("integer grid 141 x 141", PointArray(
+            [float(i) for i in range(141) for j in range(141)],
+            [float(j) for i in range(141) for j in range(141)])),
+    ]
+    for name, points in cases:
+        # (run as a script this module is __main__, the engine uses the
+        # counters of the imported module)
+        predicates.reset_stats()
+        start = time.perf_counter()
+        dt = DelaunayTriangulation(points)
+        dt.triangulate("bowyer_watson")
+        elapsed = time.perf_counter() - start
+        counts = predicates.stats
+        calls = counts["orient2d"] + counts["incircle"]
+        exact = counts["orient2d_exact"] + counts["incircle_exact"]
+        print(f"{name}: {len(dt.triangles)} triangles in {elapsed:.2f}s, "
+              f"{calls} predicate calls, {100.0 * (calls - exact) / calls:.3f}% fast path")
+
+
+if __name__ == "__main__":
+    _benchmark()
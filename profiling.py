@@ -0,0 +1,90 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profile:
+    """Counters, timers and per-phase wall time / peak memory of a run.
+
+    A Profile is handed to DelaunayTriangulation (and main); without one
+    the code only checks for None, so there is no measurable cost when
+    profiling is off. With *trace_memory* the peak memory use of every
+    phase is measured with tracemalloc, which makes the run itself slower.
+    """
+
+    def __init__(self, trace_memory=True):
+        """Constructor
+
+        :param trace_memory: measure peak memory per phase (tracemalloc)
+        :type trace_memory: bool
+        """
+        self.trace_memory = trace_memory
+        # name -> number
+        self.counters = {}
+        # name -> seconds, time spent in parts of a phase (e.g. circumcircle)
+        self.timers = {}
+        # one dict per phase: name, seconds, peak_bytes
+        self.phases = []
+
+    def count(self, name, amount=1):
+        """Adds *amount* to counter *name*"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, name, seconds):
+        """Adds *seconds* to timer *name*"""
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager that records the wall time (and peak memory) of
+        the code inside it as phase *name*
+        """
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            entry = {"name": name, "seconds": time.perf_counter() - start, "peak_bytes": None}
+            if self.trace_memory:
+                entry["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+            self.phases.append(entry)
+
+    def as_dict(self):
+        """Returns everything measured as a dict (JSON serializable)"""
+        return {"phases": self.phases, "counters": self.counters, "timers": self.timers}
+
+    def dump(self, path):
+        """Writes everything measured to the JSON file *path*"""
+        with open(path, "w") as fh:
+            json.dump(self.as_dict(), fh, indent=1)
+
+    def report(self):
+        """Returns everything measured as readable text"""
+        lines = ["phase                             seconds    peak MB"]
+        for entry in self.phases:
+            peak = entry["peak_bytes"]
+            peak = f"{peak / 1e6:10.2f}" if peak is not None else "         -"
+            lines.append(f"{entry['name']:30s} {entry['seconds']:10.4f} {peak}")
+        if self.timers:
+            lines.append("")
+            lines.append("time spent in                     seconds")
+            for name, seconds in self.timers.items():
+                lines.append(f"{name:30s} {seconds:10.4f}")
+        if self.counters:
+            lines.append("")
+            lines.append("counter                             count")
+            for name, value in self.counters.items():
+                lines.append(f"{name:30s} {value:10d}")
+        return "\n".join(lines)
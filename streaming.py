@@ -0,0 +1,385 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Out-of-core triangulation of point files that do not fit in memory.
+
+The points are read in chunks and spread over the tiles of a regular grid,
+every tile in its own file on disk. Tiles are then triangulated one at a
+time, together with the ring of tiles around them. A triangle is only
+written when it is certain to be a triangle of the triangulation of all
+points: its circumcircle may not reach any tile that was not loaded (a
+hull edge has to lie on the convex hull of all points, which is found
+while reading). Tiles for which this does not hold are loaded as well and
+the tile is done again, so the result is the same as triangulating all
+points at once (with the Bowyer-Watson engine).
+
+Every triangle is written by one tile only: the tile of its smallest point
+(by x, then y). Memory use is bounded by the points of about 9 tiles,
+plus the tiles that a (rare) large circumcircle reaches.
+"""
+
+import gzip
+import math
+import os
+import shutil
+import tempfile
+from array import array
+
+from delaunay import GHOST, _Mesh, _brio_order, circle_reach
+from geometry import PointArray, Triangle
+from predicates import orient2d
+from wkt_writer import (WKTWriter, TRIANGLES_HEADER, CIRCUMCIRCLES_HEADER,
+                        triangle_rows, circumcircle_rows)
+
+
+def read_point_chunks(path, chunk_size=1 << 16):
+    """Reads the points of a text file, *chunk_size* points at a time.
+
+    Understands the points file of DelaunayTriangulation.output_points
+    (POINT(x y) rows below a header) and rows that start with x and y,
+    separated by white space or a comma. Other rows (headers) are skipped.
+    Files ending in .gz are decompressed while reading.
+
+    Generates (xs, ys) tuples of array('d')
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    xs, ys = array("d"), array("d")
+    with opener(path, "rt") as fh:
+        for line in fh:
+            if line.startswith("POINT"):
+                x, y = line[line.index("(") + 1:line.index(")")].split()
+            else:
+                parts = line.replace(",", " ").split()
+                if len(parts) < 2:
+                    continue
+                x, y = parts[0], parts[1]
+            try:
+                xs.append(float(x))
+                ys.append(float(y))
+            except ValueError:
+                # header (xs and ys stay the same length: y comes second)
+                del xs[len(ys):]
+                continue
+            if len(xs) == chunk_size:
+                yield xs, ys
+                xs, ys = array("d"), array("d")
+    if xs:
+        yield xs, ys
+
+
+class TileStore:
+    """Points spread over the tiles of a regular grid, one file per tile.
+
+    Points are collected in memory per tile and appended to the tile files
+    when *buffer_points* points are waiting. For every tile the number of
+    points and their bounding box are kept.
+    """
+
+    def __init__(self, directory, bounds, n_tiles, buffer_points=1 << 18):
+        """Constructor
+
+        :param directory: where the tile files are written
+        :type directory: str
+
+        :param bounds: bounding box of all points
+        :type bounds: (xmin, ymin, xmax, ymax) tuple
+
+        :param n_tiles: number of tiles aimed for (the grid gets about
+            square tiles, so there can be a few more)
+        :type n_tiles: int
+
+        :param buffer_points: points kept in memory before writing
+        :type buffer_points: int
+        """
+        self.directory = directory
+        self.xmin, self.ymin, xmax, ymax = bounds
+        width = xmax - self.xmin
+        height = ymax - self.ymin
+        if width > 0 and height > 0:
+            self.ncols = min(max(1, round(math.sqrt(n_tiles * width / height))), n_tiles)
+        else:
+            self.ncols = n_tiles if width > 0 else 1
+        self.nrows = max(1, math.ceil(n_tiles / self.ncols))
+        self.tile_width = width / self.ncols or 1.0
+        self.tile_height = height / self.nrows or 1.0
+        self.n_tiles = self.ncols * self.nrows
+        self.counts = [0] * self.n_tiles
+        # (xmin, ymin, xmax, ymax) of the points in every tile
+        self.boxes = [None] * self.n_tiles
+        self.buffer_points = buffer_points
+        self._buffers = {}
+        self._pending = 0
+
+    def tile_of(self, x, y):
+        """Index of the tile that contains (x, y)"""
+        col = min(max(int((x - self.xmin) / self.tile_width), 0), self.ncols - 1)
+        row = min(max(int((y - self.ymin) / self.tile_height), 0), self.nrows - 1)
+        return row * self.ncols + col
+
+    def path(self, tile):
+        """File with the coordinates of *tile* (x, y pairs of float64)"""
+        return os.path.join(self.directory, f"tile_{tile}.bin")
+
+    def add(self, xs, ys):
+        """Adds the points with coordinates *xs* and *ys*"""
+        buffers, counts, boxes = self._buffers, self.counts, self.boxes
+        for x, y in zip(xs, ys):
+            tile = self.tile_of(x, y)
+            buf = buffers.get(tile)
+            if buf is None:
+                buf = buffers[tile] = array("d")
+            buf.append(x)
+            buf.append(y)
+            counts[tile] += 1
+            box = boxes[tile]
+            if box is None:
+                boxes[tile] = (x, y, x, y)
+            elif not (box[0] <= x <= box[2] and box[1] <= y <= box[3]):
+                boxes[tile] = (min(box[0], x), min(box[1], y), max(box[2], x), max(box[3], y))
+        self._pending += len(xs)
+        if self._pending >= self.buffer_points:
+            self.flush()
+
+    def flush(self):
+        """Appends the points waiting in memory to the tile files"""
+        for tile, buf in self._buffers.items():
+            with open(self.path(tile), "ab") as fh:
+                buf.tofile(fh)
+        self._buffers = {}
+        self._pending = 0
+
+    def load(self, tile):
+        """Returns the points of *tile* as (xs, ys) arrays"""
+        coords = array("d")
+        if self.counts[tile]:
+            with open(self.path(tile), "rb") as fh:
+                coords.fromfile(fh, 2 * self.counts[tile])
+        return coords[0::2], coords[1::2]
+
+    def ring(self, tile, distance=1):
+        """Indices of the non-empty tiles at most *distance* rows and
+        columns away from *tile* (*tile* itself included)
+        """
+        row, col = divmod(tile, self.ncols)
+        result = []
+        for r in range(max(row - distance, 0), min(row + distance, self.nrows - 1) + 1):
+            for c in range(max(col - distance, 0), min(col + distance, self.ncols - 1) + 1):
+                if self.counts[r * self.ncols + c]:
+                    result.append(r * self.ncols + c)
+        return result
+
+    def safe_box(self, tile):
+        """Area covered by the ring of tiles around *tile*: points inside
+        it are in a tile of the ring. On the sides of the grid the area is
+        unbounded (there are no points beyond the grid).
+        """
+        row, col = divmod(tile, self.ncols)
+        inf = math.inf
+        # (a little smaller, for rounding in tile_of)
+        dx, dy = 1e-9 * self.tile_width, 1e-9 * self.tile_height
+        xmin = self.xmin + (col - 1) * self.tile_width + dx if col > 1 else -inf
+        xmax = self.xmin + (col + 2) * self.tile_width - dx if col < self.ncols - 2 else inf
+        ymin = self.ymin + (row - 1) * self.tile_height + dy if row > 1 else -inf
+        ymax = self.ymin + (row + 2) * self.tile_height - dy if row < self.nrows - 2 else inf
+        return xmin, ymin, xmax, ymax
+
+
+def convex_hull(points, hull=()):
+    """Convex hull of (x, y) tuples (counter-clockwise, without points in
+    the middle of an edge); with *hull* that of the points together with
+    an earlier hull, so that a hull can be built chunk by chunk.
+
+    Returns list of (x, y) tuples
+    """
+    pts = sorted(set(points).union(hull))
+    if len(pts) < 3:
+        return pts
+    lower = []
+    for p in pts:
+        while len(lower) >= 2 and orient2d(*lower[-2], *lower[-1], *p) <= 0:
+            lower.pop()
+        lower.append(p)
+    upper = []
+    for p in reversed(pts):
+        while len(upper) >= 2 and orient2d(*upper[-2], *upper[-1], *p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def tile_triangles(store, tile, hull):
+    """Returns the triangles (Triangle instances) written by *tile*: the
+    triangles of all points that have their smallest point in *tile*
+    (*hull* is the convex hull of all points, see convex_hull).
+    """
+    loaded = [tile] + [t for t in store.ring(tile) if t != tile]
+    safe = store.safe_box(tile)
+    n_own = store.counts[tile]
+    while True:
+        xs, ys = array("d"), array("d")
+        for t in loaded:
+            txs, tys = store.load(t)
+            xs.extend(txs)
+            ys.extend(tys)
+        mesh = _Mesh(xs, ys)
+        if len(xs) > 2:
+            mesh.insert_all(_brio_order(xs, ys))
+        others = [t for t in range(store.n_tiles) if store.counts[t] and t not in loaded]
+        if mesh.last < 0:
+            # (nearly) all points on a line so far: load more
+            missing = set(others)
+        else:
+            missing = _uncertain_tiles(mesh, n_own, store, others, safe, hull)
+        if not missing:
+            break
+        loaded.extend(sorted(missing))
+    points = PointArray.from_buffers(xs, ys)
+    tv = mesh.tv
+    result = []
+    for base in range(0, len(tv), 3):
+        a, b, c = tv[base], tv[base + 1], tv[base + 2]
+        if a == GHOST or b == GHOST or c == GHOST:
+            continue
+        first = min((xs[a], ys[a], a), (xs[b], ys[b], b), (xs[c], ys[c], c))[2]
+        if first < n_own:
+            i, j, k = sorted((a, b, c))
+            result.append(Triangle(points[i], points[j], points[k]))
+    return result
+
+
+def _uncertain_tiles(mesh, n_own, store, others, safe, hull):
+    """Tiles of *others* (not loaded) that could hold a point that changes
+    a triangle of *mesh* with a point of the tile (the first *n_own*
+    points of the mesh). Everything inside *safe* (a box) is loaded.
+    """
+    xs, ys, tv = mesh.xs, mesh.ys, mesh.tv
+    boxes = store.boxes
+    missing = set()
+    for base in range(0, len(tv), 3):
+        a, b, c = tv[base], tv[base + 1], tv[base + 2]
+        if not (0 <= a < n_own or 0 <= b < n_own or 0 <= c < n_own):
+            continue
+        if a == GHOST or b == GHOST or c == GHOST:
+            # hull edge (u, v): no point may be on or left of it
+            if a == GHOST:
+                u, v = b, c
+            elif b == GHOST:
+                u, v = c, a
+            else:
+                u, v = a, b
+            ux, uy, vx, vy = xs[u], ys[u], xs[v], ys[v]
+            left = [t for t in others if _box_reaches_left(boxes[t], ux, uy, vx, vy)]
+            if left and _on_hull(ux, uy, vx, vy, hull):
+                # only a point in between u and v would split the edge
+                x0, x1 = min(ux, vx), max(ux, vx)
+                y0, y1 = min(uy, vy), max(uy, vy)
+                left = [t for t in left if boxes[t][0] <= x1 and x0 <= boxes[t][2]
+                        and boxes[t][1] <= y1 and y0 <= boxes[t][3]]
+            missing.update(left)
+            continue
+        cx, cy, reach = circle_reach(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c])
+        if (safe[0] <= cx - reach and cx + reach <= safe[2]
+                and safe[1] <= cy - reach and cy + reach <= safe[3]):
+            continue
+        for t in others:
+            x0, y0, x1, y1 = boxes[t]
+            dx = max(x0 - cx, 0.0, cx - x1)
+            dy = max(y0 - cy, 0.0, cy - y1)
+            if dx * dx + dy * dy <= reach * reach:
+                missing.add(t)
+    return missing
+
+
+def _box_reaches_left(box, ux, uy, vx, vy):
+    """Can a point in *box* be on or left of the line from u to v?"""
+    x0, y0, x1, y1 = box
+    return (orient2d(ux, uy, vx, vy, x0, y0) >= 0 or orient2d(ux, uy, vx, vy, x1, y0) >= 0
+            or orient2d(ux, uy, vx, vy, x0, y1) >= 0 or orient2d(ux, uy, vx, vy, x1, y1) >= 0)
+
+
+def _on_hull(ux, uy, vx, vy, hull):
+    """Is the edge from u to v part of an edge of *hull*, in the same
+    direction?
+    """
+    for i in range(len(hull)):
+        (ax, ay), (bx, by) = hull[i - 1], hull[i]
+        if (orient2d(ax, ay, bx, by, ux, uy) == 0 and orient2d(ax, ay, bx, by, vx, vy) == 0
+                and (vx - ux) * (bx - ax) + (vy - uy) * (by - ay) > 0):
+            return True
+    return False
+
+
+def triangulate_file(path, triangles_file, circumcircles_file=None, tile_points=100000,
+                     workdir=None, compress=False, segments=400, max_error=None,
+                     chunk_size=1 << 16, max_segments=None):
+    """Triangulates the points in the file *path* (see read_point_chunks),
+    without ever holding all of them in memory, and writes the triangles
+    (and, when *circumcircles_file* is given, their circumcircles) in the
+    format of DelaunayTriangulation.output_triangles / output_circumcircles,
+    tile by tile as they are finished.
+
+    :param tile_points: number of points per tile aimed for; about 9 times
+        as many are in memory at the same time
+    :type tile_points: int
+
+    :param workdir: directory for the tile files (default: a temporary
+        directory that is removed afterwards)
+    :type workdir: str
+
+    For *compress*, *segments*, *max_error* and *max_segments* see main.
+
+    Raises ValueError when *tile_points* is less than 1
+
+    Returns dict with the numbers of points, tiles and triangles
+    """
+    if tile_points < 1:
+        raise ValueError(f"tile_points should be at least 1, not {tile_points}")
+    # first pass: extent, convex hull and number of points
+    count = 0
+    xmin = ymin = math.inf
+    xmax = ymax = -math.inf
+    hull = []
+    for xs, ys in read_point_chunks(path, chunk_size):
+        count += len(xs)
+        hull = convex_hull(zip(xs, ys), hull)
+        xmin, xmax = min(xmin, min(xs)), max(xmax, max(xs))
+        ymin, ymax = min(ymin, min(ys)), max(ymax, max(ys))
+    stats = {"points": count, "tiles": 0, "triangles": 0}
+    own_dir = workdir is None
+    if own_dir:
+        workdir = tempfile.mkdtemp(prefix="tiles_")
+    try:
+        if count:
+            # second pass: spread the points over the tiles
+            store = TileStore(workdir, (xmin, ymin, xmax, ymax), max(1, math.ceil(count / tile_points)))
+            for xs, ys in read_point_chunks(path, chunk_size):
+                store.add(xs, ys)
+            store.flush()
+            stats["tiles"] = store.n_tiles
+        circles = None
+        with WKTWriter(triangles_file, compress) as out:
+            out.write(TRIANGLES_HEADER)
+            if circumcircles_file is not None:
+                circles = WKTWriter(circumcircles_file, compress)
+                circles.write(CIRCUMCIRCLES_HEADER)
+            try:
+                for tile in range(stats["tiles"]):
+                    if not store.counts[tile]:
+                        continue
+                    triangles = tile_triangles(store, tile, hull)
+                    # numbered across the tiles, so that the ids are unique
+                    first_id = stats["triangles"]
+                    stats["triangles"] += len(triangles)
+                    out.write_rows(triangle_rows(triangles, header=False, first_id=first_id))
+                    if circles is not None:
+                        circles.write_rows(circumcircle_rows(triangles, segments, max_error, header=False,
+                                                             first_id=first_id,
+                                                             max_segments=max_segments))
+            finally:
+                if circles is not None:
+                    circles.close()
+    finally:
+        if own_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return stats
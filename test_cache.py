@@ -0,0 +1,109 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Tests of the on-disk result cache (cache.py); run with pytest"""
+
+import os
+import stat
+import threading
+
+import pytest
+
+import workloads
+from cache import ResultCache
+from delaunay import DelaunayTriangulation
+from geometry import Point
+
+
+@pytest.fixture
+def points():
+    return workloads.make_points("uniform", 100, seed=71)
+
+
+def _triangulate(points, method, cache, robust=False):
+    dt = DelaunayTriangulation(points, robust=robust, cache=cache)
+    dt.triangulate(method)
+    return dt
+
+
+def test_hit_equals_engine(tmp_path, points):
+    cache = ResultCache(str(tmp_path))
+    computed = _triangulate(points, "bowyer_watson", cache)
+    cached = _triangulate(points, "bowyer_watson", cache)
+    assert cache.stats["misses"] == cache.stats["stores"] == cache.stats["hits"] == 1
+    assert cached.triangle_indices == computed.triangle_indices
+    assert [(t.p0.x, t.p1.y, t.p2.x) for t in cached.triangles] == [
+        (t.p0.x, t.p1.y, t.p2.x) for t in computed.triangles]
+
+
+def test_key(points):
+    key = ResultCache.key(points, "bowyer_watson")
+    listed = [Point(x, y) for x, y in zip(points.xs, points.ys)]
+    assert ResultCache.key(listed, "bowyer_watson") == key
+    assert ResultCache.key(points, "divide_and_conquer") != key
+    assert ResultCache.key(points, "bowyer_watson", robust=True) != key
+    listed[0], listed[1] = listed[1], listed[0]
+    assert ResultCache.key(listed, "bowyer_watson") != key
+
+
+def test_damaged_file_is_a_miss(tmp_path, points):
+    cache = ResultCache(str(tmp_path))
+    key = cache.key(points, "bowyer_watson")
+    expected = _triangulate(points, "bowyer_watson", cache).triangle_indices
+    with open(cache.path(key), "r+b") as fh:
+        fh.truncate(os.path.getsize(cache.path(key)) - 1)
+    assert cache.get(key) is None
+    assert not os.path.exists(cache.path(key))
+    assert _triangulate(points, "bowyer_watson", cache).triangle_indices == expected
+
+
+def test_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=3000)
+    keys = []
+    for i in range(6):
+        key = f"{i:064x}"
+        cache.put(key, [(j, j + 1, j + 2) for j in range(80)], 100)
+        keys.append(key)
+        # (the modification time orders the files)
+        os.utime(cache.path(key), (i, i))
+    assert cache.stats["evictions"] > 0
+    left = [key for key in keys if os.path.exists(cache.path(key))]
+    assert left == keys[-len(left):]
+    assert sum(os.path.getsize(cache.path(key)) for key in left) <= 3000
+
+
+def test_file_mode_follows_umask(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    old = os.umask(0o027)
+    try:
+        cache.put("a" * 64, [(0, 1, 2)], 3)
+    finally:
+        os.umask(old)
+    assert stat.S_IMODE(os.stat(cache.path("a" * 64)).st_mode) == 0o640
+    assert os.listdir(str(tmp_path)) == ["a" * 64 + ".tri"]
+
+
+def test_concurrent_writers(tmp_path):
+    # readers see a whole file or none, and no temporary files are left
+    triples = [(j, j + 1, j + 2) for j in range(20000)]
+    key = "b" * 64
+    errors = []
+
+    def work():
+        cache = ResultCache(str(tmp_path))
+        try:
+            for _ in range(10):
+                cache.put(key, triples, 20002)
+                found = cache.get(key)
+                assert found is None or found == triples
+        except BaseException as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert os.listdir(str(tmp_path)) == [key + ".tri"]
@@ -0,0 +1,118 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Tests that the triangulation engines agree (delaunay.py); run with pytest"""
+
+import numpy as np
+import pytest
+
+import native
+import predicates
+import workloads
+from delaunay import DelaunayTriangulation, make_random_points
+from geometry import PointArray
+
+ENGINES = ("brute_force", "vectorized", "bowyer_watson", "divide_and_conquer")
+
+
+def _triangulate(points, method, robust=False, workers=1):
+    dt = DelaunayTriangulation(points, robust=robust)
+    dt.triangulate(method, workers)
+    return dt
+
+
+def _exact_grid(side):
+    return PointArray([float(i) for i in range(side) for j in range(side)],
+                      [float(j) for i in range(side) for j in range(side)])
+
+
+def _hull_area(points):
+    from streaming import convex_hull
+
+    hull = convex_hull(zip(points.xs, points.ys))
+    # (relative to a corner: large coordinates would cancel out)
+    ox, oy = hull[0]
+    return 0.5 * abs(sum((x0 - ox) * (y1 - oy) - (x1 - ox) * (y0 - oy)
+                         for (x0, y0), (x1, y1) in zip(hull, hull[1:] + hull[:1])))
+
+
+def _assert_delaunay(points, triangle_indices):
+    """No triangle is flat, no point is strictly inside a circumcircle, and
+    the triangles cover the convex hull
+    """
+    xs, ys = points.xs, points.ys
+    area = 0.0
+    for i, j, k in triangle_indices:
+        orientation = predicates.orient2d(xs[i], ys[i], xs[j], ys[j], xs[k], ys[k])
+        assert orientation != 0
+        area += 0.5 * abs(orientation)
+        for p in range(len(xs)):
+            inside = predicates.incircle(xs[i], ys[i], xs[j], ys[j], xs[k], ys[k], xs[p], ys[p])
+            assert inside * orientation <= 0
+    assert area == pytest.approx(_hull_area(points), rel=1e-9)
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "clustered", "grid"])
+def test_engines_agree_in_general_position(distribution):
+    points = workloads.make_points(distribution, 60, seed=11)
+    expected = _triangulate(points, "bowyer_watson").triangle_indices
+    _assert_delaunay(points, expected)
+    for method in ENGINES:
+        for robust in (False, True):
+            assert _triangulate(points, method, robust).triangle_indices == expected, (method, robust)
+
+
+def test_robust_engines_agree_nearly_cocircular():
+    # (the epsilon rules see these points as cocircular and find nothing)
+    points = workloads.make_points("near_circle", 24, seed=11)
+    expected = _triangulate(points, "bowyer_watson").triangle_indices
+    _assert_delaunay(points, expected)
+    for method in ENGINES:
+        assert _triangulate(points, method, robust=True).triangle_indices == expected, method
+
+
+def test_engines_agree_on_integer_points():
+    points = make_random_points(60)
+    expected = _triangulate(points, "bowyer_watson").triangle_indices
+    for method in ENGINES:
+        assert _triangulate(points, method).triangle_indices == expected, method
+
+
+def test_parallel_brute_force_agrees():
+    points = workloads.make_points("uniform", 40, seed=3)
+    assert (_triangulate(points, "brute_force", workers=2).triangle_indices
+            == _triangulate(points, "brute_force").triangle_indices)
+
+
+@pytest.mark.skipif(not native.available(), reason="the native library is not built")
+def test_native_agrees():
+    points = workloads.make_points("uniform", 60, seed=13)
+    assert (_triangulate(points, "native").triangle_indices
+            == _triangulate(points, "bowyer_watson").triangle_indices)
+
+
+@pytest.mark.parametrize("points", [_exact_grid(8), workloads.make_points("circle", 24, seed=17)],
+                         ids=["grid", "circle"])
+def test_degenerate_input(points):
+    # (4 or more cocircular points) Bowyer-Watson and divide and conquer
+    # break the ties with the same rule; the brute-force engines leave
+    # holes, but never make a triangle the others do not have
+    expected = _triangulate(points, "bowyer_watson").triangle_indices
+    _assert_delaunay(points, expected)
+    assert _triangulate(points, "divide_and_conquer").triangle_indices == expected
+    for method in ("brute_force", "vectorized"):
+        for robust in (False, True):
+            found = _triangulate(points, method, robust).triangle_indices
+            assert set(found) <= set(expected), (method, robust)
+
+
+def test_projected_coordinates():
+    # a 1 m spread at 1e6: the epsilon rules fail here, the exact
+    # predicates do not
+    rng = np.random.default_rng(19)
+    points = PointArray((1e6 + rng.random(50)).tolist(), (1e6 + rng.random(50)).tolist())
+    expected = _triangulate(points, "bowyer_watson").triangle_indices
+    _assert_delaunay(points, expected)
+    assert _triangulate(points, "divide_and_conquer").triangle_indices == expected
+    assert _triangulate(points, "brute_force", robust=True).triangle_indices == expected
@@ -0,0 +1,107 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Tests of DelaunayTriangulation.insert and remove against a rebuild of
+the triangulation; run with pytest
+"""
+
+import random
+
+import pytest
+
+import loaders
+import workloads
+from delaunay import DelaunayTriangulation
+from geometry import Point, PointArray
+
+
+def _rebuilt(points):
+    dt = DelaunayTriangulation(points)
+    dt.triangulate("bowyer_watson")
+    return dt
+
+
+def _as_points(points):
+    return [Point(x, y) for x, y in zip(points.xs, points.ys)]
+
+
+def _assert_same_as_rebuild(dt):
+    rebuilt = _rebuilt(dt.points)
+    assert dt.triangle_indices == rebuilt.triangle_indices
+    assert [(t.p0.x, t.p0.y, t.p1.x, t.p1.y, t.p2.x, t.p2.y) for t in dt.triangles] == [
+        (t.p0.x, t.p0.y, t.p1.x, t.p1.y, t.p2.x, t.p2.y) for t in rebuilt.triangles]
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "PointArray"])
+@pytest.mark.parametrize("distribution", ["uniform", "circle"])
+def test_insert(distribution, compact):
+    points = workloads.make_points(distribution, 300, seed=21)
+    first, more = _as_points(points)[:200], _as_points(points)[200:]
+    dt = DelaunayTriangulation(PointArray.from_points(first) if compact else first)
+    dt.triangulate("bowyer_watson")
+    dt.insert(more[:50])
+    _assert_same_as_rebuild(dt)
+    dt.insert(more[50:])
+    _assert_same_as_rebuild(dt)
+    assert len(dt.points) == 300
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "PointArray"])
+@pytest.mark.parametrize("distribution", ["uniform", "circle"])
+def test_remove(distribution, compact):
+    points = workloads.make_points(distribution, 300, seed=23)
+    listed = _as_points(points)
+    dt = DelaunayTriangulation(points if compact else listed)
+    dt.triangulate("bowyer_watson")
+    gone = random.Random(5).sample(listed, 100)
+    dt.remove(gone[:40])
+    _assert_same_as_rebuild(dt)
+    dt.remove(gone[40:])
+    _assert_same_as_rebuild(dt)
+    assert len(dt.points) == 200
+
+
+def test_insert_existing_point_is_skipped():
+    points = _as_points(workloads.make_points("uniform", 50, seed=25))
+    dt = _rebuilt(list(points))
+    dt.insert(points[:5])
+    assert len(dt.points) == 50
+    _assert_same_as_rebuild(dt)
+
+
+def test_remove_missing_point():
+    dt = _rebuilt(_as_points(workloads.make_points("uniform", 50, seed=27)))
+    with pytest.raises(ValueError):
+        dt.remove([Point(-1.0, -1.0)])
+
+
+def test_insert_after_other_engine():
+    points = _as_points(workloads.make_points("uniform", 80, seed=29))
+    dt = DelaunayTriangulation(points[:60])
+    dt.triangulate("divide_and_conquer")
+    dt.insert(points[60:])
+    _assert_same_as_rebuild(dt)
+
+
+def test_insert_and_remove_on_mapped_points(tmp_path):
+    # load_binary maps the file: the buffers cannot grow
+    points = workloads.make_points("uniform", 120, seed=31)
+    path = str(tmp_path / "points.bin")
+    loaders.save_binary(points, path)
+    dt = _rebuilt(loaders.load_binary(path))
+    extra = _as_points(workloads.make_points("uniform", 20, seed=33))
+    dt.insert(extra)
+    _assert_same_as_rebuild(dt)
+    dt.remove(extra[:10] + _as_points(points)[:10])
+    _assert_same_as_rebuild(dt)
+    assert len(dt.points) == 120
+
+
+def test_insert_and_remove_round_trip():
+    points = _as_points(workloads.make_points("clustered", 200, seed=35))
+    dt = _rebuilt(points[:150])
+    before = [tuple(t) for t in dt.triangle_indices]
+    dt.insert(points[150:])
+    dt.remove(points[150:])
+    assert dt.triangle_indices == before
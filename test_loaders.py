@@ -0,0 +1,107 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Round-trip tests of the point file loaders (loaders.py); run with pytest"""
+
+import gzip
+
+import pytest
+
+import loaders
+import workloads
+from delaunay import DelaunayTriangulation
+
+# small blocks: most lines (and the header) end up split over blocks
+BLOCK_SIZES = (7, 64, loaders.BLOCK_SIZE)
+
+
+@pytest.fixture
+def points():
+    # (repr of these floats needs up to 17 digits)
+    return workloads.make_points("clustered", 500, seed=61)
+
+
+def _assert_same(loaded, points):
+    assert list(loaded.xs) == list(points.xs)
+    assert list(loaded.ys) == list(points.ys)
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+@pytest.mark.parametrize("name", ["points.wkt", "points.wkt.gz"])
+def test_wkt_round_trip(tmp_path, points, name, block_size):
+    path = str(tmp_path / name)
+    with open(path, "wb") as fh:
+        DelaunayTriangulation(points).output_points(fh, compress=name.endswith(".gz"))
+    _assert_same(loaders.load_wkt(path, block_size), points)
+    _assert_same(loaders.load_points(path, block_size=block_size), points)
+
+
+def test_wkt_with_more_columns(tmp_path):
+    path = str(tmp_path / "points.wkt")
+    with open(path, "w") as fh:
+        fh.write("wkt\tid\nPOINT(1.5 2)\t0\nPOINT (3 -4e2)\t1\n")
+    loaded = loaders.load_wkt(path, block_size=5)
+    assert (list(loaded.xs), list(loaded.ys)) == ([1.5, 3.0], [2.0, -400.0])
+
+
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+@pytest.mark.parametrize("header", ["", "name,x,y,z\n"])
+@pytest.mark.parametrize("name", ["points.csv", "points.csv.gz"])
+def test_csv_round_trip(tmp_path, points, name, header, block_size):
+    path = str(tmp_path / name)
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(path, "wt") as fh:
+        fh.write(header)
+        for i, (x, y) in enumerate(zip(points.xs, points.ys)):
+            fh.write(f"{i};{x!r},{y!r} 0\n")
+    _assert_same(loaders.load_csv(path, 1, 2, block_size), points)
+    _assert_same(loaders.load_points(path, x_column=1, y_column=2, block_size=block_size), points)
+
+
+def test_csv_errors(tmp_path):
+    path = str(tmp_path / "points.txt")
+    with open(path, "w") as fh:
+        fh.write("1 2\n3 4 5\n")
+    with pytest.raises(ValueError):
+        loaders.load_csv(path)
+    with pytest.raises(ValueError):
+        loaders.load_csv(path, 0, 2)
+
+
+def test_empty_text_files(tmp_path):
+    for name, text in (("empty.csv", ""), ("header.csv", "x,y\n"), ("empty.wkt", "wkt\n")):
+        path = str(tmp_path / name)
+        with open(path, "w") as fh:
+            fh.write(text)
+        assert len(loaders.load_points(path)) == 0
+
+
+@pytest.mark.parametrize("name", ["points.bin", "points.f64"])
+def test_binary_round_trip(tmp_path, points, name):
+    path = str(tmp_path / name)
+    loaders.save_binary(points, path)
+    loaded = loaders.load_points(path)
+    _assert_same(loaded, points)
+    # the mapping is private: changes do not reach the file
+    loaded.xs[0] = -1.0
+    _assert_same(loaders.load_binary(path), points)
+
+
+def test_binary_from_points_and_empty(tmp_path):
+    path = str(tmp_path / "points.bin")
+    loaders.save_binary(list(workloads.make_points("uniform", 3, seed=63)), path)
+    assert len(loaders.load_binary(path)) == 3
+    loaders.save_binary([], path)
+    assert len(loaders.load_binary(path)) == 0
+    with open(path, "wb") as fh:
+        fh.write(b"\0" * 24)
+    with pytest.raises(ValueError):
+        loaders.load_binary(path)
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        loaders.load_points(str(tmp_path / "points.shp"))
+    with pytest.raises(ValueError):
+        loaders.load_points(str(tmp_path / "points.wkt"), fmt="shp")
@@ -0,0 +1,87 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Tests of pipeline.triangulate_and_write against the in-memory output
+methods; run with pytest
+"""
+
+import gzip
+
+import pytest
+
+import workloads
+from delaunay import DelaunayTriangulation
+from pipeline import triangulate_and_write
+
+
+def _read(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as fh:
+        return fh.read().splitlines()
+
+
+def _without_ids(lines):
+    """The rows with the triangle_id column left out (in memory it is
+    id(tri), streamed a running number)
+    """
+    rows = [line.split("\t") for line in lines]
+    return [row[:1] + row[2:] for row in rows]
+
+
+def _in_memory(points, method, tmp_path, ext, max_error):
+    dt = DelaunayTriangulation(points)
+    dt.triangulate(method)
+    compress = ext.endswith(".gz")
+    files = []
+    for name, output in (("points", dt.output_points), ("triangles", dt.output_triangles),
+                         ("circumcircles", dt.output_circumcircles)):
+        path = str(tmp_path / ("memory_" + name + ext))
+        with open(path, "wb") as fh:
+            if name == "circumcircles":
+                output(fh, compress, 16, max_error)
+            else:
+                output(fh, compress)
+        files.append(_read(path))
+    return files
+
+
+@pytest.mark.parametrize("method", ["brute_force", "vectorized", "bowyer_watson", "divide_and_conquer"])
+@pytest.mark.parametrize("ext", [".wkt", ".wkt.gz"])
+def test_stream_equals_in_memory(tmp_path, method, ext):
+    points = workloads.make_points("uniform", 70, seed=51)
+    max_error = 0.5 if method == "bowyer_watson" else None
+    expected = _in_memory(points, method, tmp_path, ext, max_error)
+    paths = [str(tmp_path / (name + ext)) for name in ("points", "triangles", "circumcircles")]
+    count = triangulate_and_write(DelaunayTriangulation(points), method, *paths,
+                                  compress=ext.endswith(".gz"), segments=16, max_error=max_error,
+                                  batch_size=7, max_batches=2)
+    found = [_read(path) for path in paths]
+    assert count == len(expected[1]) - 1
+    assert found[0] == expected[0]
+    for streamed, memory in zip(found[1:], expected[1:]):
+        assert streamed[0] == memory[0]
+        assert _without_ids(streamed[1:]) == _without_ids(memory[1:])
+        assert [line.split("\t")[1] for line in streamed[1:]] == [str(i) for i in range(count)]
+
+
+def test_stream_with_workers(tmp_path):
+    points = workloads.make_points("uniform", 40, seed=53)
+    expected = _in_memory(points, "brute_force", tmp_path, ".wkt", None)
+    paths = [str(tmp_path / (name + ".wkt")) for name in ("points", "triangles", "circumcircles")]
+    triangulate_and_write(DelaunayTriangulation(points), "brute_force", *paths, segments=16,
+                          workers=2, batch_size=5)
+    found = [_read(path) for path in paths]
+    assert sorted(_without_ids(found[1][1:])) == sorted(_without_ids(expected[1][1:]))
+
+
+def test_writer_error_is_raised(tmp_path):
+    class Broken:
+        def write(self, data):
+            raise OSError("disk full")
+
+    points = workloads.make_points("uniform", 200, seed=55)
+    with pytest.raises(OSError, match="disk full"):
+        triangulate_and_write(DelaunayTriangulation(points), "bowyer_watson",
+                              str(tmp_path / "points.wkt"), Broken(), str(tmp_path / "circles.wkt"),
+                              batch_size=4, max_batches=1)
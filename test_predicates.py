@@ -0,0 +1,71 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Tests of the robust predicates (predicates.py); run with pytest"""
+
+import random
+from itertools import permutations
+
+import predicates
+import workloads
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+
+def test_orient2d_nearly_collinear():
+    # points on the line y = x, moved by an ulp or so, at projected
+    # coordinates: the float determinant alone gets many signs wrong
+    rng = random.Random(1)
+    for _ in range(2000):
+        a = rng.uniform(1e5, 1e6)
+        b = rng.uniform(1e5, 1e6)
+        c = rng.uniform(1e5, 1e6)
+        coords = (a, a, b, b + rng.choice((-1, 0, 1)) * 1e-10 * b, c, c)
+        assert _sign(predicates.orient2d(*coords)) == _sign(predicates.orient2d_exact(*coords))
+
+
+def test_orient2d_collinear():
+    assert predicates.orient2d(0.1, 0.1, 0.2, 0.2, 0.3, 0.3) == predicates.orient2d_exact(
+        0.1, 0.1, 0.2, 0.2, 0.3, 0.3)
+    assert predicates.orient2d(1e6, 2e6, 1e6 + 1, 2e6 + 2, 1e6 + 2, 2e6 + 4) == 0
+
+
+def test_incircle_nearly_cocircular():
+    points = workloads.make_points("near_circle", 200, seed=5)
+    xs, ys = points.xs, points.ys
+    rng = random.Random(2)
+    for _ in range(2000):
+        a, b, c, d = rng.sample(range(len(xs)), 4)
+        coords = (xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], xs[d], ys[d])
+        assert _sign(predicates.incircle(*coords)) == _sign(predicates.incircle_exact(*coords))
+
+
+def test_incircle_exactly_cocircular():
+    points = workloads.make_points("circle", 100, seed=5)
+    xs, ys = points.xs, points.ys
+    rng = random.Random(3)
+    for _ in range(500):
+        a, b, c, d = rng.sample(range(len(xs)), 4)
+        assert predicates.incircle(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], xs[d], ys[d]) == 0
+
+
+def test_incircle_perturbed_breaks_ties_consistently():
+    # for cocircular points never 0, and the sign only depends on the
+    # points: an even permutation of a, b, c keeps it, an odd one flips it
+    points = workloads.make_points("circle", 50, seed=7)
+    xs, ys = points.xs, points.ys
+    rng = random.Random(4)
+    for _ in range(200):
+        a, b, c, d = rng.sample(range(len(xs)), 4)
+        signs = {}
+        for order in permutations((a, b, c)):
+            coords = [v for p in order + (d,) for v in (xs[p], ys[p])]
+            value = predicates.incircle_perturbed(*coords)
+            assert value != 0
+            parity = sum(order[i] > order[j] for i in range(3) for j in range(i + 1, 3)) % 2
+            signs.setdefault(parity, set()).add(_sign(value))
+        assert len(signs[0]) == len(signs[1]) == 1
+        assert signs[0] != signs[1]
@@ -0,0 +1,117 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Tests of the out-of-core triangulation (streaming.py) against the
+triangulation in memory; run with pytest
+"""
+
+import gzip
+
+import pytest
+
+import workloads
+from delaunay import DelaunayTriangulation
+from geometry import PointArray
+from streaming import read_point_chunks, triangulate_file
+
+
+def _write_points(points, path):
+    dt = DelaunayTriangulation(points)
+    with open(path, "wb") as fh:
+        dt.output_points(fh, compress=path.endswith(".gz"))
+
+
+def _read_rows(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as fh:
+        header = fh.readline()
+        return header, [line.rstrip("\n").split("\t") for line in fh]
+
+
+def _corners(wkt):
+    """The corners of a triangle row, without the order"""
+    values = wkt[wkt.index("((") + 2:wkt.index("))")].split(", ")
+    return frozenset(values[:3])
+
+
+def _in_memory(points):
+    dt = DelaunayTriangulation(points)
+    dt.triangulate("bowyer_watson")
+    return dt
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "clustered", "circle"])
+def test_tiles_equal_in_memory(tmp_path, distribution):
+    points = workloads.make_points(distribution, 1200, seed=41)
+    path = str(tmp_path / "points.wkt")
+    _write_points(points, path)
+    triangles_file = str(tmp_path / "triangles.wkt")
+    circles_file = str(tmp_path / "circumcircles.wkt")
+    stats = triangulate_file(path, triangles_file, circles_file, tile_points=150)
+    assert stats["points"] == 1200
+    assert stats["tiles"] > 1
+
+    dt = _in_memory(points)
+    expected = {frozenset("{!r} {!r}".format(p.x, p.y) for p in (t.p0, t.p1, t.p2))
+                for t in dt.triangles}
+    _, rows = _read_rows(triangles_file)
+    found = [_corners(row[0]) for row in rows]
+    assert len(found) == len(set(found)) == stats["triangles"]
+    assert set(found) == expected
+    ids = [row[1] for row in rows]
+    assert ids == [str(i) for i in range(len(rows))]
+    _, circle_rows = _read_rows(circles_file)
+    assert [row[1] for row in circle_rows] == ids
+
+
+def test_exact_grid(tmp_path):
+    # every square of the grid has 4 cocircular corners: the tiles pick
+    # the same diagonals as the whole triangulation
+    side = 40
+    points = PointArray([float(i) for i in range(side) for j in range(side)],
+                        [float(j) for i in range(side) for j in range(side)])
+    path = str(tmp_path / "grid.wkt")
+    _write_points(points, path)
+    triangles_file = str(tmp_path / "triangles.wkt")
+    stats = triangulate_file(path, triangles_file, tile_points=200)
+    assert stats["tiles"] > 1
+    expected = {frozenset("{!r} {!r}".format(p.x, p.y) for p in (t.p0, t.p1, t.p2))
+                for t in _in_memory(points).triangles}
+    _, rows = _read_rows(triangles_file)
+    assert {_corners(row[0]) for row in rows} == expected
+    assert len(rows) == len(expected)
+
+
+def test_one_point_per_tile(tmp_path):
+    points = workloads.make_points("uniform", 60, seed=43)
+    path = str(tmp_path / "points.wkt")
+    _write_points(points, path)
+    triangles_file = str(tmp_path / "triangles.wkt")
+    stats = triangulate_file(path, triangles_file, tile_points=1)
+    _, rows = _read_rows(triangles_file)
+    assert len(rows) == stats["triangles"] == len(_in_memory(points).triangles)
+    with pytest.raises(ValueError):
+        triangulate_file(path, triangles_file, tile_points=0)
+
+
+@pytest.mark.parametrize("name", ["points.wkt", "points.wkt.gz"])
+def test_read_point_chunks(tmp_path, name):
+    points = workloads.make_points("uniform", 1000, seed=45)
+    path = str(tmp_path / name)
+    _write_points(points, path)
+    xs, ys = [], []
+    for chunk_xs, chunk_ys in read_point_chunks(path, chunk_size=64):
+        assert 0 < len(chunk_xs) == len(chunk_ys) <= 64
+        xs.extend(chunk_xs)
+        ys.extend(chunk_ys)
+    assert xs == list(points.xs)
+    assert ys == list(points.ys)
+
+
+def test_read_point_chunks_xy_rows(tmp_path):
+    path = str(tmp_path / "points.txt")
+    with open(path, "w") as fh:
+        fh.write("x,y\n1.5,2.5\n3 4\n\n-5e3\t6e-3 7\n")
+    assert [(list(xs), list(ys)) for xs, ys in read_point_chunks(path)] == [
+        ([1.5, 3.0, -5e3], [2.5, 4.0, 6e-3])]
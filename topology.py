@@ -0,0 +1,205 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+from array import array
+
+
+class TriangleTopology:
+    """Half-edge structure of a triangulation.
+
+    Triangle t has the half-edges 3*t, 3*t+1 and 3*t+2, in counter-clockwise
+    order. Half-edge h starts at point origin[h] and ends at the origin of
+    next_edge(h); twin[h] is the half-edge in the neighbouring triangle that
+    runs the other way along the same edge (-1 on the convex hull). All of
+    this lives in flat integer arrays, and is built in linear (expected)
+    time from the (i, j, k) index triples of the triangles.
+    """
+
+    def __init__(self, triangles, xs, ys):
+        """Constructor
+
+        :param triangles: point indices of the triangles
+        :type triangles: sequence of (i, j, k) tuples
+
+        :param xs: x-coordinates of the points
+        :type xs: sequence of float
+
+        :param ys: y-coordinates of the points
+        :type ys: sequence of float
+        """
+        self.xs = xs
+        self.ys = ys
+        origin = array("l")
+        for i, j, k in triangles:
+            # make the triangle counter-clockwise
+            if (xs[i] - xs[k]) * (ys[j] - ys[k]) - (ys[i] - ys[k]) * (xs[j] - xs[k]) < 0:
+                j, k = k, j
+            origin.extend((i, j, k))
+        self.origin = origin
+        n_edges = len(origin)
+        twin = array("l", [-1]) * n_edges
+        # one outgoing half-edge per point (-1 for points not used)
+        vertex_edge = array("l", [-1]) * len(xs)
+        edge_of = {}
+        for h in range(n_edges):
+            u = origin[h]
+            v = origin[h + 1 if h % 3 != 2 else h - 2]
+            other = edge_of.pop((v, u), None)
+            if other is None:
+                edge_of[(u, v)] = h
+            else:
+                twin[h] = other
+                twin[other] = h
+            vertex_edge[u] = h
+        # for a point on the hull, start its star at the hull edge leaving
+        # it, so that vertex_star can run counter-clockwise in one go
+        for h in edge_of.values():
+            vertex_edge[origin[h]] = h
+        self.twin = twin
+        self.vertex_edge = vertex_edge
+        self._adjacency = None
+
+    def __len__(self):
+        """Number of triangles"""
+        return len(self.origin) // 3
+
+    @staticmethod
+    def next_edge(h):
+        """Next half-edge (counter-clockwise) in the same triangle"""
+        return h + 1 if h % 3 != 2 else h - 2
+
+    @staticmethod
+    def prev_edge(h):
+        """Previous half-edge (clockwise) in the same triangle"""
+        return h - 1 if h % 3 != 0 else h + 2
+
+    def triangle(self, t):
+        """Point indices of triangle t, counter-clockwise"""
+        origin = self.origin
+        return origin[3 * t], origin[3 * t + 1], origin[3 * t + 2]
+
+    def neighbour(self, t, e):
+        """The triangle on the other side of edge e (0, 1, 2) of triangle
+        t (edge e runs from point e to point e+1), -1 on the hull
+        """
+        h = self.twin[3 * t + e]
+        return h // 3 if h >= 0 else -1
+
+    def neighbours(self, t):
+        """The 3 neighbouring triangles of triangle t (-1 on the hull)"""
+        return tuple(self.neighbour(t, e) for e in range(3))
+
+    def opposite_vertex(self, t, e):
+        """The point of the neighbour over edge e of triangle t that is not
+        on that edge (-1 on the hull)
+        """
+        h = self.twin[3 * t + e]
+        if h < 0:
+            return -1
+        return self.origin[self.prev_edge(h)]
+
+    def vertex_star(self, v):
+        """Triangles around point v, counter-clockwise (for a point on the
+        convex hull from one hull edge to the other)
+        """
+        start = self.vertex_edge[v]
+        if start < 0:
+            return []
+        star = []
+        h = start
+        while True:
+            star.append(h // 3)
+            h = self.twin[self.prev_edge(h)]
+            if h < 0 or h == start:
+                return star
+
+    def vertex_neighbours(self, v):
+        """Points connected to point v by an edge, counter-clockwise"""
+        start = self.vertex_edge[v]
+        if start < 0:
+            return []
+        origin = self.origin
+        result = []
+        h = start
+        while True:
+            result.append(origin[self.next_edge(h)])
+            p = self.prev_edge(h)
+            h = self.twin[p]
+            if h < 0:
+                # hull: the last neighbour is the start of the incoming edge
+                result.append(origin[p])
+                return result
+            if h == start:
+                return result
+
+    def adjacency(self):
+        """Per point the list of points connected to it by an edge
+        (vertex_neighbours of every point; empty for points not used),
+        built on first use
+        """
+        if self._adjacency is None:
+            self._adjacency = [self.vertex_neighbours(v) for v in range(len(self.vertex_edge))]
+        return self._adjacency
+
+    def hull_edges(self):
+        """The half-edges on the convex hull, as (start, end) point pairs"""
+        origin, twin = self.origin, self.twin
+        return [(origin[h], origin[self.next_edge(h)]) for h in range(len(origin)) if twin[h] < 0]
+
+    def edges(self):
+        """All edges once (shared edges are not repeated), as
+        (start, end, on_hull) tuples
+        """
+        origin, twin = self.origin, self.twin
+        result = []
+        for h in range(len(origin)):
+            other = twin[h]
+            if other < h:
+                result.append((origin[h], origin[self.next_edge(h)], other < 0))
+        return result
+
+    def locate(self, x, y, start=0):
+        """Returns the triangle that contains point (x, y), or -1 when the
+        point is outside the convex hull.
+
+        Walks from triangle *start* towards the point, each time crossing
+        an edge that has the point on its outer side. This assumes the
+        triangles cover the convex hull without holes (as a Delaunay
+        triangulation in general position does). A point on an edge shared
+        by two triangles may be reported in either of them.
+        """
+        origin, twin, xs, ys = self.origin, self.twin, self.xs, self.ys
+        n_triangles = len(origin) // 3
+        if n_triangles == 0:
+            return -1
+        t = start
+        for steps in range(n_triangles + 1):
+            base = 3 * t
+            # rotating the first edge tried avoids walking in circles
+            for e in (steps % 3, (steps + 1) % 3, (steps + 2) % 3):
+                u = origin[base + e]
+                v = origin[base + e + 1 if e != 2 else base]
+                if (xs[u] - x) * (ys[v] - y) - (ys[u] - y) * (xs[v] - x) < 0:
+                    h = twin[base + e]
+                    if h < 0:
+                        return -1
+                    t = h // 3
+                    break
+            else:
+                return t
+        # the walk did not end: check every triangle
+        for t in range(n_triangles):
+            if self.contains(t, x, y):
+                return t
+        return -1
+
+    def contains(self, t, x, y):
+        """Is point (x, y) inside (or on the boundary of) triangle t?"""
+        origin, xs, ys = self.origin, self.xs, self.ys
+        for e in range(3):
+            u = origin[3 * t + e]
+            v = origin[3 * t + (e + 1) % 3]
+            if (xs[u] - x) * (ys[v] - y) - (ys[u] - y) * (xs[v] - x) < 0:
+                return False
+        return True
@@ -8,11 +8,24 @@
 
 #include <cmath>
 #include <algorithm>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <functional>
+#include <string>
+#include <thread>
 #include <iostream>
 #include <fstream>
 #include <random>
 #include <vector>
 
+// functions exported from the shared library (see CMakeLists.txt)
+#if defined(_WIN32)
+#define TRIANGULATE_API extern "C" __declspec(dllexport)
+#else
+#define TRIANGULATE_API extern "C" __attribute__((visibility("default")))
+#endif
+
 
 // epsilon for checking whether values are close
 const double EPSILON = 1e-8;
@@ -82,126 +95,415 @@ Circle circumcircle(Triangle t) {
     return {center, radius};
 }
 
-// Function to print a circle in WKT format
-void printCircleWKT(const Circle &c, std::ostream& stream, int num_segments = 100) {
-    stream << "POLYGON ((";
-    stream << c.center.x + c.radius << " " << c.center.y; // first point
-    for (int i = 1; i < num_segments; ++i) {
-        double theta = 2.0 * M_PI * i / num_segments;
-        double dx = c.radius * std::cos(theta);
-        double dy = c.radius * std::sin(theta);
-        stream << ", ";
-        stream << c.center.x + dx << " " << c.center.y + dy;
-    }
-    stream << ", ";
-    stream << c.center.x + c.radius << " " << c.center.y; // last
-    stream << "))" << std::endl;
+// Appends v to out the way Python's repr(float) writes it: the shortest
+// digits that read back as v, fixed notation for exponents -4 .. 15 (with
+// at least one decimal), scientific otherwise; so the files written here
+// are the same as those of the Python writers (wkt_writer.py)
+void appendDouble(std::string &out, double v) {
+    if (std::isnan(v)) {
+        out += "nan";
+        return;
+    }
+    if (std::isinf(v)) {
+        out += v > 0 ? "inf" : "-inf";
+        return;
+    }
+    char buf[32];
+    for (int precision = 1; precision <= 17; ++precision) {
+        snprintf(buf, sizeof(buf), "%.*e", precision - 1, v);
+        if (precision == 17 || strtod(buf, nullptr) == v) {
+            break;
+        }
+    }
+    // buf is [-]d[.ddd]e(+|-)xx: split it in sign, digits and exponent
+    const char *p = buf;
+    if (*p == '-') {
+        out += '-';
+        ++p;
+    }
+    std::string digits;
+    for (; *p != 'e'; ++p) {
+        if (*p != '.') {
+            digits += *p;
+        }
+    }
+    int exponent = atoi(p + 1);
+    while (digits.size() > 1 && digits.back() == '0') {
+        digits.pop_back();
+    }
+    if (exponent >= 16 || exponent < -4) {
+        out += digits[0];
+        if (digits.size() > 1) {
+            out += '.';
+            out.append(digits, 1, std::string::npos);
+        }
+        snprintf(buf, sizeof(buf), "e%c%02d", exponent < 0 ? '-' : '+', abs(exponent));
+        out += buf;
+    } else if (exponent >= 0) {
+        if (digits.size() < static_cast<size_t>(exponent) + 1) {
+            digits.append(exponent + 1 - digits.size(), '0');
+        }
+        out.append(digits, 0, exponent + 1);
+        out += '.';
+        out += digits.size() > static_cast<size_t>(exponent) + 1 ? digits.substr(exponent + 1) : "0";
+    } else {
+        out += "0.";
+        out.append(-exponent - 1, '0');
+        out += digits;
+    }
 }
 
-// Function to print a triangle in WKT format
-void printTriangleWKT(const Triangle &t, std::ostream& stream) {
-    stream << "POLYGON (("
-              << t.a.x << " " << t.a.y << ", "
-              << t.b.x << " " << t.b.y << ", "
-              << t.c.x << " " << t.c.y << ", "
-              << t.a.x << " " << t.a.y
-              << "))" << std::endl;
-}
 
-// Function to print a point in WKT format
-void printPointWKT(const Point &p, std::ostream& stream) {
-    stream << "POINT ("
-              << p.x << " " << p.y
-              << ")" << std::endl;
-}
+// Output file that collects its text in memory and writes it in large
+// blocks (instead of flushing after every line, as std::endl does)
+class BufferedFile {
+public:
+    explicit BufferedFile(const std::string &path, size_t buffer_size = 1 << 20)
+        : file(path, std::ios::binary), limit(buffer_size) {
+        buffer.reserve(buffer_size + 4096);
+    }
 
+    ~BufferedFile() {
+        flush();
+    }
 
-// the triangulation happens in this function
-void triangulate(int number_of_points) {
-    // Use default random number generator
-    std::default_random_engine generator;
-    // seed the random generator
-    // it will be random points, but always the same ones
-    generator.seed(2023); 
-    std::uniform_int_distribution<int> distribution(0, 100);
+    bool good() const {
+        return file.good();
+    }
 
-    // Generate random points
-    std::vector<Point> points(number_of_points);
-    for (int i = 0; i < number_of_points; ++i) {
-        auto x = distribution(generator);
-        auto y = distribution(generator);
-        points[i] = {static_cast<double>(x), static_cast<double>(y)};
+    // the text of the current row; call endRow when it is complete
+    std::string &text() {
+        return buffer;
     }
 
-    // Check all possible combinations of triangles
-    std::vector<Triangle> triangles;
-    for (int i = 0; i < number_of_points; ++i) {
-        for (int j = i + 1; j < number_of_points; ++j) {
-            for (int k = j + 1; k < number_of_points; ++k) {
+    void endRow() {
+        buffer += '\n';
+        if (buffer.size() >= limit) {
+            flush();
+        }
+    }
+
+    void flush() {
+        file.write(buffer.data(), static_cast<std::streamsize>(buffer.size()));
+        buffer.clear();
+    }
+
+private:
+    std::ofstream file;
+    std::string buffer;
+    size_t limit;
+};
+
+
+// Writes points, triangles and circumcircles files in the format of the
+// Python writers (header line, tab-separated columns), with triangle_id
+// the number of the triangle (the same in both files)
+bool writeOutput(const std::string &directory, const double *xs, const double *ys, int64_t n,
+                 const std::vector<int64_t> &indices, int segments) {
+    BufferedFile points(directory + "/points.wkt");
+    BufferedFile triangles(directory + "/triangles.wkt");
+    BufferedFile circles(directory + "/circumcircles.wkt");
+    if (!points.good() || !triangles.good() || !circles.good()) {
+        return false;
+    }
+
+    points.text() += "wkt";
+    points.endRow();
+    for (int64_t i = 0; i < n; ++i) {
+        std::string &row = points.text();
+        row += "POINT(";
+        appendDouble(row, xs[i]);
+        row += ' ';
+        appendDouble(row, ys[i]);
+        row += ')';
+        points.endRow();
+    }
+
+    triangles.text() += "wkt\ttriangle_id\tarea\tperimeter";
+    triangles.endRow();
+    circles.text() += "wkt\ttriangle_id\tarea\tperimeter";
+    circles.endRow();
+    // cos / sin of the circle vertices, as geometry.unit_circle
+    std::vector<double> cos_table(segments), sin_table(segments);
+    double step = 2.0 * M_PI / segments;
+    for (int s = 0; s < segments; ++s) {
+        cos_table[s] = std::cos(s * step);
+        sin_table[s] = std::sin(s * step);
+    }
+    for (size_t t = 0; t < indices.size(); t += 3) {
+        Triangle tri = {{xs[indices[t]], ys[indices[t]]},
+                        {xs[indices[t + 1]], ys[indices[t + 1]]},
+                        {xs[indices[t + 2]], ys[indices[t + 2]]}};
+        std::string id = std::to_string(t / 3);
+
+        std::string &row = triangles.text();
+        row += "POLYGON((";
+        const Point corners[4] = {tri.a, tri.b, tri.c, tri.a};
+        for (int c = 0; c < 4; ++c) {
+            if (c > 0) {
+                row += ", ";
+            }
+            appendDouble(row, corners[c].x);
+            row += ' ';
+            appendDouble(row, corners[c].y);
+        }
+        // area with the shoelace formula and perimeter, as metrics.py
+        double a = distance(tri.a, tri.b);
+        double b = distance(tri.b, tri.c);
+        double c = distance(tri.c, tri.a);
+        double area = 0.5 * fabs((tri.b.x - tri.a.x) * (tri.c.y - tri.a.y)
+                                 - (tri.c.x - tri.a.x) * (tri.b.y - tri.a.y));
+        row += "))\t";
+        row += id;
+        row += '\t';
+        if (area * area < EPSILON) {
+            row += '0';
+        } else {
+            appendDouble(row, area);
+        }
+        row += '\t';
+        appendDouble(row, a + b + c);
+        triangles.endRow();
+
+        Circle circle = circumcircle(tri);
+        std::string &circle_row = circles.text();
+        circle_row += "POLYGON((";
+        for (int s = 0; s <= segments; ++s) {
+            int v = s < segments ? s : 0;
+            if (s > 0) {
+                circle_row += ", ";
+            }
+            appendDouble(circle_row, circle.center.x + cos_table[v] * circle.radius);
+            circle_row += ' ';
+            appendDouble(circle_row, circle.center.y + sin_table[v] * circle.radius);
+        }
+        circle_row += "))\t";
+        circle_row += id;
+        circle_row += '\t';
+        appendDouble(circle_row, M_PI * std::pow(circle.radius, 2));
+        circle_row += '\t';
+        appendDouble(circle_row, 2 * M_PI * circle.radius);
+        circles.endRow();
+    }
+    return true;
+}
+
+
+// Brute-force Delaunay test of the (i, j, k) triples of the n points with
+// coordinates xs[0..n), ys[0..n), for first <= i < last; the indices of the
+// accepted triangles are appended to result (3 per triangle, i < j < k, in
+// loop order)
+void delaunayTriplesRange(const double *xs, const double *ys, int64_t n, int64_t first, int64_t last,
+                          std::vector<int64_t> &result) {
+    for (int64_t i = first; i < last; ++i) {
+        Point pi = {xs[i], ys[i]};
+        for (int64_t j = i + 1; j < n; ++j) {
+            Point pj = {xs[j], ys[j]};
+            for (int64_t k = j + 1; k < n; ++k) {
+                Point pk = {xs[k], ys[k]};
                 // orientation test; skip if points are on a line
-                if (areCollinear(points[i], points[j], points[k]) == true) {
+                if (areCollinear(pi, pj, pk) == true) {
                     continue;
                 }
-                Triangle t = {points[i], points[j], points[k]};
-                Circle c = circumcircle(t);
+                Circle c = circumcircle({pi, pj, pk});
                 // Check if any other point is inside this circle
                 int cover_count = 0;
-                for (int l = 0; l < number_of_points; ++l) {
-                    if (c.covers(points[l])) { // if so, increase the count
+                for (int64_t l = 0; l < n; ++l) {
+                    if (c.covers({xs[l], ys[l]})) { // if so, increase the count
                         cover_count += 1;
+                        // a 4th covered point already decides
+                        if (cover_count > 3) {
+                            break;
+                        }
                     }
                 }
                 // if we have exactly 3 points covered (the 3 corners)
                 // it's a valid delaunay triangle
                 if (cover_count == 3) {
-                    triangles.push_back(t);
+                    result.push_back(i);
+                    result.push_back(j);
+                    result.push_back(k);
                 }
             }
         }
     }
+}
 
-    // Print all Delaunay triangles
-    for (const Triangle &t: triangles) {
-        printTriangleWKT(t, std::cout);
+
+// All triples, with the outer index i split over the given number of
+// threads: every thread gets a contiguous range of i with about the same
+// number of triples (small i has far more of them) and its own result
+// vector; these are joined in order, so the result does not depend on the
+// number of threads
+void delaunayTriples(const double *xs, const double *ys, int64_t n, std::vector<int64_t> &result,
+                     int threads = 1) {
+    if (threads <= 1 || n < 3) {
+        delaunayTriplesRange(xs, ys, n, 0, n, result);
+        return;
+    }
+    // outer index i has (n-1-i)(n-2-i)/2 triples
+    double total = 0.0;
+    for (int64_t i = 0; i < n; ++i) {
+        total += 0.5 * static_cast<double>(n - 1 - i) * static_cast<double>(n - 2 - i);
+    }
+    std::vector<int64_t> bounds = {0};
+    double done = 0.0;
+    for (int64_t i = 0; i < n && static_cast<int>(bounds.size()) < threads; ++i) {
+        done += 0.5 * static_cast<double>(n - 1 - i) * static_cast<double>(n - 2 - i);
+        if (done >= total * static_cast<double>(bounds.size()) / threads) {
+            bounds.push_back(i + 1);
+        }
     }
+    bounds.push_back(n);
 
-    // Print all circles
-    for (const Triangle &t: triangles) {
-        Circle c = circumcircle(t);
-        printCircleWKT(c, std::cout);
+    std::vector<std::vector<int64_t>> parts(bounds.size() - 1);
+    std::vector<std::thread> workers;
+    for (size_t t = 0; t < parts.size(); ++t) {
+        workers.emplace_back(delaunayTriplesRange, xs, ys, n, bounds[t], bounds[t + 1], std::ref(parts[t]));
+    }
+    for (std::thread &worker: workers) {
+        worker.join();
+    }
+    for (const std::vector<int64_t> &part: parts) {
+        result.insert(result.end(), part.begin(), part.end());
     }
+}
+
+
+// C interface of the shared library, used from Python with ctypes
+// (native.py): the caller passes its own coordinate buffers (nothing is
+// copied), gets a handle to the result, asks its size, copies the indices
+// into a buffer of its own and frees the handle
+TRIANGULATE_API void *triangulate_xy(const double *xs, const double *ys, int64_t n, int threads) {
+    auto *result = new std::vector<int64_t>();
+    delaunayTriples(xs, ys, n, *result, threads);
+    return result;
+}
+
+TRIANGULATE_API int64_t result_size(void *handle) {
+    return static_cast<int64_t>(static_cast<std::vector<int64_t> *>(handle)->size());
+}
+
+TRIANGULATE_API void result_copy(void *handle, int64_t *out) {
+    auto *result = static_cast<std::vector<int64_t> *>(handle);
+    std::copy(result->begin(), result->end(), out);
+}
+
+TRIANGULATE_API void result_free(void *handle) {
+    delete static_cast<std::vector<int64_t> *>(handle);
+}
+
 
-    // Print all points
-    for (const Point &p: points) {
-        printPointWKT(p, std::cout);
+// Generates number_of_points random points with integer coordinates in
+// [0, 100]; it will be random points, but always the same ones
+void randomPoints(int number_of_points, std::vector<double> &xs, std::vector<double> &ys) {
+    // Use default random number generator
+    std::default_random_engine generator;
+    // seed the random generator
+    generator.seed(2023);
+    std::uniform_int_distribution<int> distribution(0, 100);
+
+    for (int i = 0; i < number_of_points; ++i) {
+        auto x = distribution(generator);
+        auto y = distribution(generator);
+        xs.push_back(static_cast<double>(x));
+        ys.push_back(static_cast<double>(y));
     }
+}
 
-    // It is also possible to store the output in a file
-    // std::ofstream point_file;
-    // point_file.open("points.wkt");
-    // for (const Point &p: points) {
-    //     printPointWKT(p, point_file);
-    // }
-    // point_file.close();
 
+// Reads the points of a text file: the points file of the Python writers
+// (POINT(x y) rows below a header) or rows that start with x and y,
+// separated by white space or a comma; other rows are skipped (as
+// streaming.read_point_chunks, but without .gz support)
+bool readPoints(const std::string &path, std::vector<double> &xs, std::vector<double> &ys) {
+    std::ifstream file(path);
+    if (!file) {
+        return false;
+    }
+    std::string line;
+    while (std::getline(file, line)) {
+        size_t start = 0;
+        if (line.compare(0, 5, "POINT") == 0) {
+            start = line.find('(');
+            if (start == std::string::npos) {
+                continue;
+            }
+            start += 1;
+        }
+        std::replace(line.begin(), line.end(), ',', ' ');
+        const char *text = line.c_str() + start;
+        char *end_x, *end_y;
+        double x = strtod(text, &end_x);
+        double y = strtod(end_x, &end_y);
+        if (end_x == text || end_y == end_x) {
+            // header
+            continue;
+        }
+        xs.push_back(x);
+        ys.push_back(y);
+    }
+    return true;
 }
 
+
+#ifndef TRIANGULATE_LIBRARY
 int main(int argc, char **argv) {
     // for Clion, check:
     // https://www.jetbrains.com/help/clion/run-debug-configuration-application.html#config-tab
-    // on how to set the number of points as program argument
-    if (argc != 2) {
+    // on how to set the program arguments
+    std::string input, output = ".";
+    int point_count = -1, threads = 1, segments = 400;
+    bool ok = true;
+    for (int a = 1; a < argc && ok; ++a) {
+        std::string arg = argv[a];
+        bool has_value = a + 1 < argc;
+        if (arg == "--input" && has_value) {
+            input = argv[++a];
+        } else if (arg == "--output" && has_value) {
+            output = argv[++a];
+        } else if (arg == "--threads" && has_value) {
+            threads = atoi(argv[++a]);
+            ok = threads > 0;
+        } else if (arg == "--segments" && has_value) {
+            segments = atoi(argv[++a]);
+            ok = segments > 2;
+        } else if (arg[0] != '-' && point_count < 0) {
+            point_count = atoi(arg.c_str());
+        } else {
+            ok = false;
+        }
+    }
+    if (!ok || (point_count < 0) == input.empty()) {
         // when the program is run for the terminal and does not receive
-        // enough arguments, stop and explain the necessary input
-        std::cout << "This is " << argv[0] << std::endl;
-        std::cout << "Call this program with an integer as program argument" << std::endl;
-        std::cout << "(to set the number of points for the triangulation)." << std::endl;
+        // the right arguments, stop and explain the necessary input
+        std::cout << "This is " << argv[0] << "\n"
+                  << "Call this program with the number of points to triangulate (random points),\n"
+                  << "or with --input FILE to triangulate the points in a file (e.g. the points.wkt\n"
+                  << "written by delaunay.py). Options:\n"
+                  << "  --threads T    split the work over T threads (default: 1)\n"
+                  << "  --output DIR   directory for points.wkt, triangles.wkt and circumcircles.wkt\n"
+                  << "                 (default: the current directory)\n"
+                  << "  --segments S   segments per circumcircle (default: 400)" << std::endl;
+        return EXIT_FAILURE;
+    }
+
+    std::vector<double> xs, ys;
+    if (input.empty()) {
+        randomPoints(point_count, xs, ys);
+    } else if (!readPoints(input, xs, ys)) {
+        std::cerr << "Cannot read " << input << std::endl;
         return EXIT_FAILURE;
-    } else {
-        // otherwise, generate the random number of points and triangulate
-        const int point_count = atoi(argv[1]);
-        triangulate(point_count);
-        return EXIT_SUCCESS;
     }
-}
 
+    // Check all possible combinations of triangles
+    std::vector<int64_t> indices;
+    delaunayTriples(xs.data(), ys.data(), static_cast<int64_t>(xs.size()), indices, threads);
+
+    if (!writeOutput(output, xs.data(), ys.data(), static_cast<int64_t>(xs.size()), indices, segments)) {
+        std::cerr << "Cannot write to " << output << std::endl;
+        return EXIT_FAILURE;
+    }
+    return EXIT_SUCCESS;
+}
+#endif // TRIANGULATE_LIBRARY
@@ -0,0 +1,353 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+import numpy as np
+from geometry import coordinates
+from predicates import CCW_ERRBOUND, ICC_ERRBOUND, orient2d_exact, incircle_exact
+
+# same (arbitrary) epsilon as used by Circle.covers and are_collinear
+EPSILON = 1e-8
+
+
+class CoverKernel:
+    """Vectorized version of the brute-force Delaunay test.
+
+    The point set is kept as two contiguous float64 arrays, so that a
+    circumcircle (or a block of circumcircles) is tested against all points
+    with a few array operations instead of one Circle.covers call per point.
+
+    The answers are identical to the ones of the pure Python code: squared
+    distances are used to throw away the points that are certainly outside
+    a circle, the few remaining ones are decided with exactly the same
+    floating point rule as Circle.covers.
+    """
+
+    def __init__(self, points, sample_size=16, max_cells=1 << 22, robust=False):
+        """Constructor
+
+        :param points: the points of the triangulation
+        :type points: sequence of Point or PointArray
+
+        :param sample_size: number of points used to cheaply reject most
+            candidate triangles before the full test
+        :type sample_size: int
+
+        :param max_cells: maximum number of (circle, point) pairs that is
+            evaluated in one array operation (bounds the memory use)
+        :type max_cells: int
+
+        :param robust: use the exact predicates (orient2d_array,
+            incircle_array) instead of the epsilon rules, as
+            DelaunayTriangulation does with robust=True
+        :type robust: bool
+        """
+        xs, ys = coordinates(points)
+        self.xs = np.ascontiguousarray(xs, dtype=np.float64)
+        self.ys = np.ascontiguousarray(ys, dtype=np.float64)
+        n = len(self.xs)
+        rng = np.random.default_rng(2023)
+        self.sample = np.sort(rng.choice(n, size=min(n, sample_size), replace=False))
+        self.max_cells = max_cells
+        self.robust = robust
+
+    def __len__(self):
+        return len(self.xs)
+
+    def collinear(self, i, j, k):
+        """Boolean array: are points i, j, k (index arrays) collinear?
+        (same rule as DelaunayTriangulation.are_collinear)
+        """
+        xs, ys = self.xs, self.ys
+        ax, ay, bx, by, cx, cy = xs[i], ys[i], xs[j], ys[j], xs[k], ys[k]
+        orientation = (ax - cx) * (by - cy) - (bx - cx) * (ay - cy)
+        return np.abs(orientation) < EPSILON
+
+    def circumcircles(self, i, j, k):
+        """Center x, center y and radius arrays of the circumcircles of the
+        triangles i, j, k (index arrays), computed as in Triangle.circumcircle
+        """
+        xs, ys = self.xs, self.ys
+        ax, ay, bx, by, cx, cy = xs[i], ys[i], xs[j], ys[j], xs[k], ys[k]
+        disc = 2.0 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+        if np.any(disc == 0):
+            raise ValueError("Discriminant cannot be 0")
+        a2 = ax ** 2 + ay ** 2
+        b2 = bx ** 2 + by ** 2
+        c2 = cx ** 2 + cy ** 2
+        ux = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / disc
+        uy = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / disc
+        radius = np.sqrt((ux - ax) ** 2 + (uy - ay) ** 2)
+        return ux, uy, radius
+
+    @staticmethod
+    def _covered(ux, uy, radius, px, py):
+        """The exact rule of Circle.covers, broadcast over arrays"""
+        dist = np.sqrt((ux - px) ** 2 + (uy - py) ** 2)
+        return (radius > dist) | (dist - radius <= EPSILON)
+
+    def count_covered(self, ux, uy, radius):
+        """Returns for every circle (arrays of center x, center y and
+        radius) the number of points it covers.
+        """
+        ux = np.atleast_1d(np.asarray(ux, dtype=np.float64))
+        uy = np.atleast_1d(np.asarray(uy, dtype=np.float64))
+        radius = np.atleast_1d(np.asarray(radius, dtype=np.float64))
+        xs, ys = self.xs, self.ys
+        counts = np.zeros(len(ux), dtype=np.intp)
+        # a point with dist <= radius + EPSILON (the covers rule, up to
+        # rounding) certainly passes this slightly wider squared test
+        limit = ((radius + EPSILON) * (1.0 + 1e-12)) ** 2
+        block = max(1, self.max_cells // max(1, len(xs)))
+        for start in range(0, len(ux), block):
+            stop = start + block
+            cx, cy = ux[start:stop, None], uy[start:stop, None]
+            d2 = (cx - xs) ** 2 + (cy - ys) ** 2
+            rows, cols = np.nonzero(d2 <= limit[start:stop, None])
+            r = rows + start
+            hit = self._covered(ux[r], uy[r], radius[r], xs[cols], ys[cols])
+            counts[start:stop] += np.bincount(rows[hit], minlength=len(cx))
+        return counts
+
+    def covers(self, circle):
+        """Boolean array: which points does *circle* cover?"""
+        return self._covered(circle.center.x, circle.center.y, circle.radius, self.xs, self.ys)
+
+    def is_delaunay(self, tri):
+        """Same answer as DelaunayTriangulation.is_delaunay for Triangle
+        *tri*, testing all points in one go.
+        """
+        p0, p1, p2 = tri.p0, tri.p1, tri.p2
+        orientation = (p0.x - p2.x) * (p1.y - p2.y) - (p1.x - p2.x) * (p0.y - p2.y)
+        if abs(orientation) < EPSILON:
+            return False
+        circle = tri.circumcircle()
+        return int(self.count_covered(circle.center.x, circle.center.y, circle.radius)[0]) == 3
+
+    def delaunay_mask(self, i, j, k):
+        """Boolean array: which of the triangles i, j, k (index arrays)
+        conform to the Delaunay criterion?
+        """
+        if self.robust:
+            return self._delaunay_mask_robust(i, j, k)
+        result = ~self.collinear(i, j, k)
+        idx = np.flatnonzero(result)
+        if len(idx) == 0:
+            return result
+        i, j, k = i[idx], j[idx], k[idx]
+        ux, uy, radius = self.circumcircles(i, j, k)
+        xs, ys = self.xs, self.ys
+        # how many of its own corners does each circle cover? (normally 3,
+        # but rounding may push a corner just outside)
+        own = np.zeros(len(idx), dtype=np.intp)
+        for v in (i, j, k):
+            own += self._covered(ux, uy, radius, xs[v], ys[v])
+        # cheap rejection: sample points (other than the corners) that are
+        # clearly inside the circle, decided on squared distances only
+        s = self.sample
+        inner = (radius * (1.0 - 1e-12)) ** 2
+        d2 = (ux[:, None] - xs[s]) ** 2 + (uy[:, None] - ys[s]) ** 2
+        hit = d2 < inner[:, None]
+        hit &= (s != i[:, None]) & (s != j[:, None]) & (s != k[:, None])
+        keep = np.flatnonzero(hit.sum(axis=1) <= 3 - own)
+        # full count for the survivors
+        ok = np.zeros(len(idx), dtype=bool)
+        ok[keep] = self.count_covered(ux[keep], uy[keep], radius[keep]) == 3
+        result[idx] = ok
+        return result
+
+    def _delaunay_mask_robust(self, i, j, k):
+        """delaunay_mask with exact predicates: a triangle conforms when it
+        is not collinear and no other point is on or inside its circle
+        """
+        xs, ys = self.xs, self.ys
+        orientation = orient2d_array(xs[i], ys[i], xs[j], ys[j], xs[k], ys[k])
+        result = orientation != 0
+        idx = np.flatnonzero(result)
+        if len(idx) == 0:
+            return result
+        i, j, k = i[idx], j[idx], k[idx]
+        sign = np.sign(orientation[idx])
+        # cheap rejection: a sample point (not a corner) on or in the circle
+        s = self.sample
+        side = incircle_array(xs[i, None], ys[i, None], xs[j, None], ys[j, None],
+                              xs[k, None], ys[k, None], xs[s], ys[s])
+        hit = (side * sign[:, None] >= 0)
+        hit &= (s != i[:, None]) & (s != j[:, None]) & (s != k[:, None])
+        keep = np.flatnonzero(~hit.any(axis=1))
+        ok = np.zeros(len(idx), dtype=bool)
+        ok[keep] = self.count_in_circle(i[keep], j[keep], k[keep], sign[keep]) == 3
+        result[idx] = ok
+        return result
+
+    def count_in_circle(self, i, j, k, sign):
+        """Returns for every triangle i, j, k (index arrays, *sign* +1 for
+        counter-clockwise, -1 for clockwise ones) the number of points on
+        or inside its circumcircle, using the exact incircle predicate
+        """
+        xs, ys = self.xs, self.ys
+        counts = np.zeros(len(i), dtype=np.intp)
+        block = max(1, self.max_cells // max(1, len(xs)))
+        for start in range(0, len(i), block):
+            part = slice(start, start + block)
+            a, b, c = i[part, None], j[part, None], k[part, None]
+            side = incircle_array(xs[a], ys[a], xs[b], ys[b], xs[c], ys[c], xs, ys)
+            counts[part] = (side * sign[part, None] >= 0).sum(axis=1)
+        return counts
+
+    def delaunay_triples(self, block_size=8192):
+        """Returns the list of (i, j, k) triples that conform to the Delaunay
+        criterion, in the same order as generated by group3.
+        """
+        return list(self.iter_delaunay_triples(block_size))
+
+    def iter_delaunay_triples(self, block_size=8192):
+        """Generates the triples of delaunay_triples, block by block as they
+        are found
+        """
+        n = len(self.xs)
+        pj, pk = np.triu_indices(n, 1)
+        # the pairs (j, k) with j > i form a suffix of the pair arrays
+        offset = 0
+        for i in range(n - 2):
+            offset += n - 1 - i
+            for start in range(offset, len(pj), block_size):
+                j = pj[start:start + block_size]
+                k = pk[start:start + block_size]
+                mask = self.delaunay_mask(np.full(len(j), i), j, k)
+                for b, c in zip(j[mask].tolist(), k[mask].tolist()):
+                    yield i, b, c
+
+
+
+def locate(topology, qx, qy, start=None, max_steps=64):
+    """Point location for many points at once (see TriangleTopology.locate).
+
+    All walks make their steps together: in every round each unfinished
+    walk checks the three edges of its current triangle and crosses the
+    first one that has the point on its outer side. Walks start from the
+    triangles in *start* (an array with a triangle per point); by default
+    a triangle near each point is found first by locating the centers of
+    a coarse grid of cells, so that the walks are short. Walks that have
+    not finished after *max_steps* rounds are finished one by one with
+    TriangleTopology.locate.
+
+    Returns an array with the triangle per point (-1 when outside the
+    convex hull)
+    """
+    qx = np.ascontiguousarray(qx, dtype=np.float64)
+    qy = np.ascontiguousarray(qy, dtype=np.float64)
+    if len(topology) == 0 or len(qx) == 0:
+        return np.full(len(qx), -1, dtype=np.intp)
+    if start is None:
+        start = _grid_seeds(topology, qx, qy)
+    found, last, finished = _walk(topology, qx, qy, np.asarray(start, dtype=np.intp), max_steps)
+    for i in np.flatnonzero(~finished):
+        found[i] = topology.locate(qx[i], qy[i], int(last[i]))
+    return found
+
+
+def _walk(topology, qx, qy, start, max_steps):
+    """Simultaneous walks from the triangles in *start*.
+
+    Returns 3 arrays: the triangle containing each point (-1 when outside
+    the hull or not finished), the last triangle visited by each walk (for
+    a point outside the hull: the one at the hull edge that was reached),
+    and whether each walk finished within *max_steps* rounds.
+    """
+    origin = np.asarray(topology.origin, dtype=np.intp)
+    twin = np.asarray(topology.twin, dtype=np.intp)
+    xs = np.asarray(topology.xs, dtype=np.float64)
+    ys = np.asarray(topology.ys, dtype=np.float64)
+    found = np.full(len(qx), -1, dtype=np.intp)
+    last = start.copy()
+    finished = np.zeros(len(qx), dtype=bool)
+    active = np.arange(len(qx))
+    for _ in range(max_steps):
+        if len(active) == 0:
+            break
+        t = last[active]
+        x, y = qx[active], qy[active]
+        cross = np.full(len(active), -1, dtype=np.intp)
+        for e in range(3):
+            u = origin[3 * t + e]
+            v = origin[3 * t + (e + 1) % 3]
+            outer = (xs[u] - x) * (ys[v] - y) - (ys[u] - y) * (xs[v] - x) < 0
+            cross = np.where((cross < 0) & outer, 3 * t + e, cross)
+        inside = cross < 0
+        found[active[inside]] = t[inside]
+        step = np.flatnonzero(~inside)
+        neighbour = twin[cross[step]]
+        moving = neighbour >= 0
+        # walks that stop here: inside a triangle, or outside a hull edge
+        finished[active[inside]] = True
+        finished[active[step[~moving]]] = True
+        active = active[step[moving]]
+        last[active] = neighbour[moving] // 3
+    return found, last, finished
+
+
+def _grid_seeds(topology, qx, qy):
+    """A start triangle per query point: the last triangle of the walk to
+    the center of its cell in a coarse grid over the queries
+    """
+    cells = max(1, int(np.sqrt(len(topology)) / 2))
+    min_x, min_y = qx.min(), qy.min()
+    size = max(qx.max() - min_x, qy.max() - min_y) / cells or 1.0
+    col = np.minimum(((qx - min_x) / size).astype(np.intp), cells - 1)
+    row = np.minimum(((qy - min_y) / size).astype(np.intp), cells - 1)
+    centers = np.arange(cells) * size + size / 2
+    seeds = np.zeros(cells * cells, dtype=np.intp)
+    # every row of centers starts from the results of the row below it,
+    # so that these walks are short as well
+    previous = np.zeros(cells, dtype=np.intp)
+    for r in range(cells):
+        cy = np.full(cells, min_y + centers[r])
+        _, last, _ = _walk(topology, min_x + centers, cy, previous, 4 * cells + 64)
+        seeds[r * cells:(r + 1) * cells] = last
+        previous = last
+    return seeds[row * cells + col]
+
+
+def orient2d_array(ax, ay, bx, by, cx, cy):
+    """predicates.orient2d for (broadcast) arrays: evaluated in floating
+    point, with exact arithmetic only for the entries whose sign is
+    uncertain
+    """
+    ax, ay, bx, by, cx, cy = np.broadcast_arrays(ax, ay, bx, by, cx, cy)
+    detleft = (ax - cx) * (by - cy)
+    detright = (ay - cy) * (bx - cx)
+    det = detleft - detright
+    uncertain = np.abs(det) < CCW_ERRBOUND * (np.abs(detleft) + np.abs(detright))
+    for idx in zip(*np.nonzero(uncertain)):
+        det[idx] = orient2d_exact(ax[idx], ay[idx], bx[idx], by[idx], cx[idx], cy[idx])
+    return det
+
+
+def incircle_array(ax, ay, bx, by, cx, cy, dx, dy):
+    """predicates.incircle for (broadcast) arrays: evaluated in floating
+    point, with exact arithmetic only for the entries whose sign is
+    uncertain
+    """
+    ax, ay, bx, by, cx, cy, dx, dy = np.broadcast_arrays(ax, ay, bx, by, cx, cy, dx, dy)
+    adx, ady = ax - dx, ay - dy
+    bdx, bdy = bx - dx, by - dy
+    cdx, cdy = cx - dx, cy - dy
+    bdxcdy, cdxbdy = bdx * cdy, cdx * bdy
+    cdxady, adxcdy = cdx * ady, adx * cdy
+    adxbdy, bdxady = adx * bdy, bdx * ady
+    alift = adx * adx + ady * ady
+    blift = bdx * bdx + bdy * bdy
+    clift = cdx * cdx + cdy * cdy
+    det = (alift * (bdxcdy - cdxbdy)
+           + blift * (cdxady - adxcdy)
+           + clift * (adxbdy - bdxady))
+    permanent = ((np.abs(bdxcdy) + np.abs(cdxbdy)) * alift
+                 + (np.abs(cdxady) + np.abs(adxcdy)) * blift
+                 + (np.abs(adxbdy) + np.abs(bdxady)) * clift)
+    errbound = ICC_ERRBOUND * permanent
+    uncertain = (np.abs(det) <= errbound) & (errbound != 0)
+    for idx in zip(*np.nonzero(uncertain)):
+        det[idx] = incircle_exact(ax[idx], ay[idx], bx[idx], by[idx],
+                                  cx[idx], cy[idx], dx[idx], dy[idx])
+    return det
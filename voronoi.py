@@ -0,0 +1,155 @@
+# GEO1000 - Assignment 4
+# Authors: Timber Groeneveld
+# Student numbers: 4213513
+
+"""Voronoi diagram of the points of a Delaunay triangulation.
+
+The Voronoi cell of a point has the circumcenters of the triangles around
+it as corners (in the same counter-clockwise order as the triangles), so
+no new triangulation is needed: every cell is read from the triangle
+topology (topology.TriangleTopology.vertex_star) and the circumcenters the
+triangles already computed (Triangle.circumcircle is cached). Every
+triangle is visited 3 times in total: O(n).
+
+A point on the convex hull has an unbounded cell; it is closed with
+points far out on its two rays (perpendicular to the hull edges) and
+clipped, like all cells, to a bounding box.
+"""
+
+import math
+
+
+def default_box(xs, ys, margin=0.1):
+    """Bounding box of the points, enlarged on every side by *margin*
+    times its largest side (by 1 when all points coincide)
+
+    Returns (xmin, ymin, xmax, ymax)
+    """
+    xmin, xmax, ymin, ymax = min(xs), max(xs), min(ys), max(ys)
+    pad = margin * max(xmax - xmin, ymax - ymin) or 1.0
+    return xmin - pad, ymin - pad, xmax + pad, ymax + pad
+
+
+def clip_polygon(polygon, box):
+    """Clips the convex polygon (list of (x, y), counter-clockwise) to the
+    box (xmin, ymin, xmax, ymax) (Sutherland-Hodgman)
+
+    Returns list of (x, y), counter-clockwise; empty when nothing is left
+    """
+    xmin, ymin, xmax, ymax = box
+    if all(xmin <= x <= xmax and ymin <= y <= ymax for x, y in polygon):
+        # (most cells)
+        return polygon
+    # every side of the box as: is (x, y) inside, and the crossing of a-b
+    sides = (
+        (lambda x, y: x >= xmin, lambda ax, ay, bx, by: (xmin, ay + (by - ay) * (xmin - ax) / (bx - ax))),
+        (lambda x, y: x <= xmax, lambda ax, ay, bx, by: (xmax, ay + (by - ay) * (xmax - ax) / (bx - ax))),
+        (lambda x, y: y >= ymin, lambda ax, ay, bx, by: (ax + (bx - ax) * (ymin - ay) / (by - ay), ymin)),
+        (lambda x, y: y <= ymax, lambda ax, ay, bx, by: (ax + (bx - ax) * (ymax - ay) / (by - ay), ymax)),
+    )
+    for inside, crossing in sides:
+        if not polygon:
+            break
+        result = []
+        ax, ay = polygon[-1]
+        a_in = inside(ax, ay)
+        for bx, by in polygon:
+            b_in = inside(bx, by)
+            if b_in != a_in:
+                corner = crossing(ax, ay, bx, by)
+                if not result or result[-1] != corner:
+                    result.append(corner)
+            if b_in and (not result or result[-1] != (bx, by)):
+                result.append((bx, by))
+            ax, ay, a_in = bx, by, b_in
+        if len(result) > 1 and result[0] == result[-1]:
+            result.pop()
+        polygon = result
+    return polygon
+
+
+def voronoi_cells(triangles, topology, box):
+    """The Voronoi cells of the points of a triangulation, clipped to *box*.
+
+    :param triangles: the triangles (Triangle instances) of the
+        triangulation, in the order of *topology*
+    :type triangles: list of Triangle
+
+    :param topology: the topology of the triangulation (without holes, as
+        made by the Bowyer-Watson or divide-and-conquer engines)
+    :type topology: topology.TriangleTopology
+
+    :param box: (xmin, ymin, xmax, ymax) to clip the cells to
+    :type box: tuple of float
+
+    Returns list with per point a list of (x, y) corners, counter-
+    clockwise (empty for points that are in no triangle)
+    """
+    xs, ys = topology.xs, topology.ys
+    origin, twin = topology.origin, topology.twin
+    centers = [tri.circumcenter for tri in triangles]
+    xmin, ymin, xmax, ymax = box
+    cx, cy = 0.5 * (xmin + xmax), 0.5 * (ymin + ymax)
+    diagonal = math.hypot(xmax - xmin, ymax - ymin)
+    cells = []
+    for v in range(len(xs)):
+        start = topology.vertex_edge[v]
+        if start < 0:
+            cells.append([])
+            continue
+        polygon = []
+        h = start
+        while True:
+            center = centers[h // 3]
+            corner = (center.x, center.y)
+            if not polygon or polygon[-1] != corner:
+                polygon.append(corner)
+            p = h - 1 if h % 3 else h + 2
+            h = twin[p]
+            if h < 0 or h == start:
+                break
+        if h < 0:
+            # hull point: incoming hull edge u -> v (the last triangle) and
+            # outgoing v -> w (the first); the cell continues outward,
+            # perpendicular to both. Far enough out (beyond the box) the
+            # cell is closed with a third point in between, so that the
+            # closing segments stay outside the box.
+            u, w = origin[p], origin[topology.next_edge(start)]
+            vx, vy = xs[v], ys[v]
+            n1x, n1y = vy - ys[u], xs[u] - vx
+            n2x, n2y = ys[w] - vy, vx - xs[w]
+            n1 = math.hypot(n1x, n1y)
+            n2 = math.hypot(n2x, n2y)
+            n1x, n1y, n2x, n2y = n1x / n1, n1y / n1, n2x / n2, n2y / n2
+            mx, my = n1x + n2x, n1y + n2y
+            m = math.hypot(mx, my) or 1.0
+            (lx, ly), (fx, fy) = polygon[-1], polygon[0]
+            far = 2.0 * (diagonal + math.hypot(lx - cx, ly - cy) + math.hypot(fx - cx, fy - cy)
+                         + math.hypot(vx - cx, vy - cy))
+            polygon.append((lx + far * n1x, ly + far * n1y))
+            polygon.append((vx + far * mx / m, vy + far * my / m))
+            polygon.append((fx + far * n2x, fy + far * n2y))
+        elif len(polygon) > 1 and polygon[0] == polygon[-1]:
+            polygon.pop()
+        cells.append(clip_polygon(polygon, box))
+    return cells
+
+
+def polygon_area(polygon):
+    """Area of the polygon (list of (x, y), counter-clockwise)"""
+    area = 0.0
+    ax, ay = polygon[-1]
+    for bx, by in polygon:
+        area += ax * by - bx * ay
+        ax, ay = bx, by
+    return 0.5 * area
+
+
+def polygon_perimeter(polygon):
+    """Perimeter of the polygon (list of (x, y))"""
+    perimeter = 0.0
+    ax, ay = polygon[-1]
+    for bx, by in polygon:
+        perimeter += math.hypot(bx - ax, by - ay)
+        ax, ay = bx, by
+    return perimeter